@@ -12,7 +12,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from shared.azure_client import AzureBlobClient
 from shared.config import AzureConfig
 from shared.user_manager import extract_user_id
-from shared.wp7_indexer import QueueThresholds, append_queue_item, build_queue_item
+from shared.wp7_indexer import QueueThresholds, build_queue_item, enqueue_queue_item, loads_json
 
 
 def _is_duplicate_interaction(existing_logs: list, candidate: dict, *, max_age_seconds: int = 30) -> bool:
@@ -119,7 +119,7 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
                     downloader = blob_client.download_blob()
                     raw = downloader.readall()
                     try:
-                        existing_logs = json.loads(raw.decode('utf-8'))
+                        existing_logs = loads_json(raw)
                         if not isinstance(existing_logs, list):
                             existing_logs = [existing_logs]
                     except Exception:
@@ -211,7 +211,7 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
                     max_items_per_run=int(os.environ.get("WP7_MAX_ITEMS_PER_RUN", "25") or 25),
                 )
                 queue_item = build_queue_item(interaction_entry, user_id=user_id, thresholds=thresholds)
-                append_queue_item(user_id, queue_item)
+                enqueue_queue_item(user_id, queue_item)
             except Exception as enqueue_exc:
                 logging.warning(f"WP7 queue enqueue failed (non-fatal): {enqueue_exc}")
 
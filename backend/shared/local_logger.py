@@ -2,19 +2,61 @@
 Local file logging for backend debugging and development analysis.
 Logs are written to backend_debug.log in project root for developer visibility.
 """
+import atexit
 import json
 import os
+import queue
+import threading
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from typing import Optional, Dict, Any
 import logging
 
+try:
+    import orjson as _orjson
+except ImportError:
+    _orjson = None
+
+
+def _dumps_line(entry: Dict[str, Any]) -> str:
+    if _orjson is not None:
+        return _orjson.dumps(entry, default=str).decode("utf-8")
+    return json.dumps(entry, default=str)
+
+
+class _JsonLineFormatter(logging.Formatter):
+    """Render the log entry dict carried in `record.msg` as one JSON line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        if isinstance(record.msg, dict):
+            return _dumps_line(record.msg)
+        return record.getMessage()
+
+
+class _SerializingQueueHandler(QueueHandler):
+    """
+    Serialize the entry dict on the calling thread before enqueueing, so later mutation of
+    the caller's metadata cannot change what gets written; file I/O stays on the listener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if isinstance(record.msg, dict):
+            record.msg = _dumps_line(record.msg)
+            record.args = None
+        return record
+
 
 class LocalLogger:
     """Local file logger with rotation for debugging"""
     
     LOG_FILE = "backend_debug.log"
+    LOGGER_NAME = "omniflow.local"
     MAX_SIZE_MB = 10
     KEEP_BACKUPS = 3
+
+    _logger = logging.getLogger(LOGGER_NAME)
+    _listener: Optional[QueueListener] = None
+    _setup_lock = threading.Lock()
     
     @staticmethod
     def _get_log_path() -> str:
@@ -23,31 +65,38 @@ class LocalLogger:
         current_dir = os.path.dirname(os.path.abspath(__file__))
         project_root = os.path.dirname(current_dir)
         return os.path.join(project_root, LocalLogger.LOG_FILE)
-    
+
     @staticmethod
-    def _rotate_if_needed(log_path: str) -> None:
-        """Rotate log file if it exceeds size limit"""
-        try:
-            if not os.path.exists(log_path):
-                return
-            
-            size_mb = os.path.getsize(log_path) / (1024 * 1024)
-            if size_mb > LocalLogger.MAX_SIZE_MB:
-                # Rotate existing backups
-                for i in range(LocalLogger.KEEP_BACKUPS - 1, 0, -1):
-                    old_backup = f"{log_path}.{i}"
-                    new_backup = f"{log_path}.{i + 1}"
-                    if os.path.exists(old_backup):
-                        if i + 1 <= LocalLogger.KEEP_BACKUPS:
-                            os.rename(old_backup, new_backup)
-                        else:
-                            os.remove(old_backup)
-                
-                # Move current log to .1
-                os.rename(log_path, f"{log_path}.1")
-                logging.info(f"Rotated log file: {log_path} ({size_mb:.1f}MB)")
-        except Exception as e:
-            logging.warning(f"Failed to rotate log: {e}")
+    def _ensure_logger() -> logging.Logger:
+        """
+        Attach the rotating file handler once per process.
+
+        Callers only enqueue; a QueueListener thread owns the RotatingFileHandler,
+        which keeps the file open between writes and handles rotation.
+        """
+        if LocalLogger._listener is not None:
+            return LocalLogger._logger
+        with LocalLogger._setup_lock:
+            if LocalLogger._listener is None:
+                file_handler = RotatingFileHandler(
+                    LocalLogger._get_log_path(),
+                    maxBytes=LocalLogger.MAX_SIZE_MB * 1024 * 1024,
+                    backupCount=LocalLogger.KEEP_BACKUPS,
+                    encoding="utf-8",
+                    delay=True,
+                )
+                file_handler.setFormatter(_JsonLineFormatter())
+                log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+                listener = QueueListener(log_queue, file_handler)
+                listener.start()
+                atexit.register(listener.stop)
+
+                logger = LocalLogger._logger
+                logger.setLevel(logging.INFO)
+                logger.propagate = False
+                logger.addHandler(_SerializingQueueHandler(log_queue))
+                LocalLogger._listener = listener
+        return LocalLogger._logger
     
     @staticmethod
     def log_to_file(
@@ -72,9 +121,6 @@ class LocalLogger:
             metadata: Additional context (endpoint, thread_id, tool_name, etc.)
         """
         try:
-            log_path = LocalLogger._get_log_path()
-            LocalLogger._rotate_if_needed(log_path)
-            
             # Mask user_id for privacy
             masked_user_id = None
             if user_id:
@@ -98,9 +144,8 @@ class LocalLogger:
             if metadata:
                 log_entry["metadata"] = metadata
             
-            # Write to file (append mode)
-            with open(log_path, "a", encoding="utf-8") as f:
-                f.write(json.dumps(log_entry) + "\n")
+            # Serialized on this thread by the queue handler; the listener only writes the line.
+            LocalLogger._ensure_logger().info(log_entry)
                 
         except Exception as e:
             # Don't let logging failures break the application
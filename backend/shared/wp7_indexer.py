@@ -14,11 +14,18 @@ Design goals:
 
 from __future__ import annotations
 
-import datetime as _dt
+import atexit
+import functools
 import json
 import logging
+import os
+import queue
+import tempfile
+import threading
+import time
+import uuid
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 from azure.core.exceptions import (
     AzureError,
@@ -31,6 +38,11 @@ from azure.storage.blob import BlobClient
 from .azure_client import AzureBlobClient
 from .config import AzureConfig, UserNamespace
 
+try:
+    import orjson as _orjson
+except ImportError:
+    _orjson = None
+
 
 WP7_QUEUE_BLOB_NAME = "interactions/indexer_queue.jsonl"
 WP7_STATE_BLOB_NAME = "interactions/indexer_state.json"
@@ -45,26 +57,39 @@ WP7_SEMANTIC_INDEX_SCHEMA_V1 = "omniflow.wp7.semantic_index.v1"
 WP7_UNCATEGORIZED_SCHEMA_V1 = "omniflow.wp7.uncategorized.v1"
 
 
+def loads_json(raw: Any) -> Any:
+    """Parse JSON from bytes or str (orjson when available, no intermediate decode)."""
+    if _orjson is not None:
+        return _orjson.loads(raw)
+    if isinstance(raw, (bytes, bytearray, memoryview)):
+        raw = bytes(raw).decode("utf-8")
+    return json.loads(raw)
+
+
 def utc_now_iso() -> str:
-    return _dt.datetime.utcnow().replace(tzinfo=_dt.timezone.utc).isoformat().replace("+00:00", "Z")
+    """UTC timestamp like `2025-01-31T12:00:00.123456Z` (no datetime allocation)."""
+    secs, nanos = divmod(time.time_ns(), 1_000_000_000)
+    return f"{time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(secs))}.{nanos // 1000:06d}Z"
 
 
 def _truncate(text: str, max_chars: int) -> str:
-    value = str(text or "")
-    if max_chars <= 0:
-        return value
-    if len(value) <= max_chars:
+    value = text if isinstance(text, str) else str(text or "")
+    if max_chars <= 0 or len(value) <= max_chars:
         return value
     return value[: max_chars - 1] + "…"
 
 
+def estimate_tokens_for_length(n_chars: int) -> Tuple[int, int]:
+    """Estimate tokens for a character count: chars/4 (low) and chars/3 (high), rounded up."""
+    return (n_chars + 3) // 4, (n_chars + 2) // 3
+
+
 def estimate_tokens_chars(text: str) -> Tuple[int, int]:
     """Estimate tokens for text using two heuristics: chars/4 (low) and chars/3 (high)."""
-    s = str(text or "")
-    n = len(s)
-    low = (n + 3) // 4
-    high = (n + 2) // 3
-    return max(0, int(low)), max(0, int(high))
+    return estimate_tokens_for_length(len(text if isinstance(text, str) else str(text or "")))
+
+
+_SIGNAL_LEVELS = frozenset(("low", "medium", "high"))
 
 
 def derive_signal_level(artifact: Dict[str, Any]) -> str:
@@ -78,11 +103,14 @@ def derive_signal_level(artifact: Dict[str, Any]) -> str:
       - medium: >= 0.65
       - low: < 0.65
     """
-    raw = str((artifact or {}).get("signal_level") or "").strip().lower()
-    if raw in ("low", "medium", "high"):
-        return raw
+    artifact = artifact or {}
+    raw = artifact.get("signal_level")
+    if isinstance(raw, str):
+        raw = raw.strip().lower()
+        if raw in _SIGNAL_LEVELS:
+            return raw
     try:
-        conf = float((artifact or {}).get("confidence"))
+        conf = float(artifact.get("confidence"))
     except Exception:
         conf = 0.0
     if conf >= 0.85:
@@ -99,32 +127,30 @@ def build_semantic_index_item(
     interaction_id: str,
     semantic_blob_path: str,
 ) -> Dict[str, Any]:
-    tags = artifact.get("tags") if isinstance(artifact.get("tags"), list) else []
-    tags_clean: List[str] = []
-    for t in tags:
-        if isinstance(t, str) and t.strip():
-            tags_clean.append(t.strip())
+    tags = artifact.get("tags")
+    if not isinstance(tags, list):
+        tags = []
+    tags_clean: List[str] = [s for t in tags if isinstance(t, str) and (s := t.strip())]
     summary = str(artifact.get("summary") or "").strip()
     summary_short = summary[:400]
+    # Keys in sorted order: append helpers serialize without sort_keys.
     return {
-        "schema_version": WP7_SEMANTIC_INDEX_SCHEMA_V1,
-        "timestamp_utc": str(artifact.get("timestamp_utc") or utc_now_iso()),
-        "user_id": str(user_id),
-        "interaction_id": str(interaction_id),
         "category": str(artifact.get("category") or "").strip(),
-        "signal_level": str(artifact.get("signal_level") or derive_signal_level(artifact)),
         "confidence": float(artifact.get("confidence") or 0.0),
-        "tags": tags_clean[:12],
-        "summary_short": summary_short,
+        "interaction_id": str(interaction_id),
+        "schema_version": WP7_SEMANTIC_INDEX_SCHEMA_V1,
         "semantic_blob_path": semantic_blob_path,
+        "signal_level": derive_signal_level(artifact),
+        "summary_short": summary_short,
+        "tags": tags_clean[:12],
+        "timestamp_utc": str(artifact.get("timestamp_utc") or utc_now_iso()),
+        "user_id": str(user_id),
     }
 
 
 def append_semantic_index_item(user_id: str, item: Dict[str, Any]) -> None:
     """Append a single JSONL line to the per-user semantic manifest index.jsonl."""
-    line = json.dumps(item, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
-    if not line.endswith("\n"):
-        line += "\n"
+    line = _jsonl_line(item)
 
     client = _get_append_blob_client(user_id, WP7_SEMANTIC_INDEX_BLOB_NAME)
     try:
@@ -136,28 +162,21 @@ def append_semantic_index_item(user_id: str, item: Dict[str, Any]) -> None:
 
 def extract_tools_used(tool_calls: Any, *, max_items: int = 25) -> List[str]:
     """Extract a compact list of tool names used in an interaction."""
+    if not tool_calls or not isinstance(tool_calls, list):
+        return []
     names: List[str] = []
-    if not tool_calls:
-        return names
-    if not isinstance(tool_calls, list):
-        return names
+    append = names.append
     for item in tool_calls:
         if len(names) >= max_items:
             break
         if not isinstance(item, dict):
             continue
-        name = item.get("name") or item.get("tool_name") or item.get("function") or item.get("operationId")
+        get = item.get
+        name = get("name") or get("tool_name") or get("function") or get("operationId")
         if name:
-            names.append(str(name))
+            append(str(name))
     # de-dup while keeping order
-    seen = set()
-    out: List[str] = []
-    for n in names:
-        if n in seen:
-            continue
-        seen.add(n)
-        out.append(n)
-    return out
+    return list(dict.fromkeys(names))
 
 
 @dataclass(frozen=True)
@@ -186,27 +205,48 @@ def build_queue_item(
 
     tools_used = extract_tools_used(interaction_entry.get("tool_calls"))
 
-    low, high = estimate_tokens_chars(user_msg + asst_msg)
+    low, high = estimate_tokens_for_length(len(user_msg) + len(asst_msg))
 
+    # Keys in sorted order: append helpers serialize without sort_keys.
     return {
-        "schema_version": WP7_QUEUE_SCHEMA_V1,
+        "assistant_response": asst_msg,
+        "estimated_tokens": low,
+        "estimated_tokens_hi": high,
         "interaction_id": interaction_id,
+        "language": "mixed",
+        "schema_version": WP7_QUEUE_SCHEMA_V1,
+        "thread_id": thread_id,
         "timestamp_utc": timestamp,
+        "tools_used": tools_used,
         "user_id": str(user_id),
-        "thread_id": thread_id,
-        "language": "mixed",
         "user_message": user_msg,
-        "assistant_response": asst_msg,
-        "tools_used": tools_used,
-        "estimated_tokens": low,
-        "estimated_tokens_hi": high,
     }
 
 
+def _jsonl_line(item: Dict[str, Any]) -> str:
+    """Serialize one item as a compact JSONL line; key order is the caller's (build items pre-sorted)."""
+    return json.dumps(item, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+_container_ready = False
+_container_lock = threading.Lock()
+
+
+def _ensure_container() -> None:
+    """Make sure the container exists, once per process."""
+    global _container_ready
+    if _container_ready:
+        return
+    with _container_lock:
+        if not _container_ready:
+            AzureBlobClient.get_container_client()
+            _container_ready = True
+
+
+@functools.lru_cache(maxsize=256)
 def _get_append_blob_client(user_id: str, blob_name: str) -> BlobClient:
     """Return a BlobClient for a user-namespaced blob name (used as Append Blob)."""
-    # Ensure container exists (and is cached)
-    AzureBlobClient.get_container_client()
+    _ensure_container()
     namespaced = UserNamespace.get_user_blob_name(user_id, blob_name)
     return BlobClient.from_connection_string(
         AzureConfig.CONNECTION_STRING,
@@ -217,9 +257,7 @@ def _get_append_blob_client(user_id: str, blob_name: str) -> BlobClient:
 
 def append_queue_item(user_id: str, item: Dict[str, Any]) -> None:
     """Append a single JSONL line to the per-user WP7 queue (Append Blob)."""
-    line = json.dumps(item, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
-    if not line.endswith("\n"):
-        line += "\n"
+    line = _jsonl_line(item)
 
     client = _get_append_blob_client(user_id, WP7_QUEUE_BLOB_NAME)
     try:
@@ -231,9 +269,7 @@ def append_queue_item(user_id: str, item: Dict[str, Any]) -> None:
 
 def append_uncategorized_portfolio_item(user_id: str, item: Dict[str, Any]) -> None:
     """Append a single JSONL line to the per-user UNCATEGORIZED portfolio."""
-    line = json.dumps(item, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
-    if not line.endswith("\n"):
-        line += "\n"
+    line = _jsonl_line(item)
 
     client = _get_append_blob_client(user_id, WP7_UNCATEGORIZED_PORTFOLIO_BLOB_NAME)
     try:
@@ -243,10 +279,242 @@ def append_uncategorized_portfolio_item(user_id: str, item: Dict[str, Any]) -> N
         raise
 
 
+# --- Background queue appends -------------------------------------------------
+# `enqueue_queue_item` keeps the Blob round-trip off the HTTP request path: items go to an
+# in-memory queue drained by one daemon thread. Each item is also mirrored to a local
+# per-process spill file (JSONL) which is truncated once the in-memory queue is fully
+# flushed; failed appends go to a `.retry` spill that the worker re-sends periodically.
+# Spill files whose owning process is gone are replayed when the next worker starts.
+# Spill names carry the pid plus a random per-process tag, so a restarted worker that
+# gets the same pid back never mistakes its predecessor's spill for its own.
+# Delivery is at-least-once (the indexer skips interaction_ids it has already indexed).
+
+WP7_PENDING_MAX = int(os.environ.get("WP7_PENDING_MAX", "1000") or 1000)
+WP7_SPILL_DIR = os.environ.get("WP7_SPILL_DIR") or os.path.join(tempfile.gettempdir(), "omniflow_wp7_spill")
+WP7_RETRY_INTERVAL_SECONDS = float(os.environ.get("WP7_RETRY_INTERVAL_SECONDS", "30") or 30)
+_SHUTDOWN_FLUSH_SECONDS = 5.0
+_SPILL_TAG = f"{os.getpid()}-{uuid.uuid4().hex[:12]}"
+_CLAIM_MARK = ".replay-"
+
+_pending: "queue.Queue[Tuple[str, Dict[str, Any]]]" = queue.Queue(maxsize=WP7_PENDING_MAX)
+_spill_lock = threading.Lock()
+_worker_lock = threading.Lock()
+_worker: Optional[threading.Thread] = None
+
+
+def _spill_path(kind: str = "") -> str:
+    return os.path.join(WP7_SPILL_DIR, f"queue-{_SPILL_TAG}{kind}.jsonl")
+
+
+def _spill_append(user_id: str, item: Dict[str, Any], *, kind: str = "") -> None:
+    try:
+        os.makedirs(WP7_SPILL_DIR, exist_ok=True)
+        with open(_spill_path(kind), "a", encoding="utf-8") as f:
+            f.write(_jsonl_line({"item": item, "user_id": str(user_id)}))
+    except OSError as e:
+        logging.warning(f"WP7 spill write failed (item kept in memory only): {e}")
+
+
+def _spill_truncate_if_drained() -> None:
+    with _spill_lock:
+        if _pending.unfinished_tasks:
+            return
+        try:
+            os.remove(_spill_path())
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logging.warning(f"WP7 spill truncate failed: {e}")
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+
+def _spill_owner(name: str) -> Optional[str]:
+    """
+    Return the tag of the process that owns a spill file, or None for unrelated files.
+
+    `queue-<tag>[.retry].jsonl` is owned by its writer; `<spill>.replay-<tag>` by the
+    process that claimed it for replay.
+    """
+    if not name.startswith("queue-"):
+        return None
+    base, mark, claimer = name.partition(_CLAIM_MARK)
+    if mark:
+        return claimer if base.endswith(".jsonl") else None
+    if not name.endswith(".jsonl"):
+        return None
+    return name[len("queue-"):-len(".jsonl")].split(".", 1)[0]
+
+
+def _owner_gone(tag: str) -> bool:
+    if tag == _SPILL_TAG:
+        return False
+    try:
+        pid = int(tag.split("-", 1)[0])
+    except ValueError:
+        return False
+    # Our own pid under a different tag is a predecessor that died and whose pid we reused.
+    return pid == os.getpid() or not _pid_alive(pid)
+
+
+def _replay_spill_file(claimed: str) -> int:
+    """
+    Re-append every record of a claimed spill file, then delete it.
+
+    Records that still fail go to this process's `.retry` spill, so nothing stays behind
+    under a claim that a live process holds.
+    """
+    replayed = 0
+    with open(claimed, "rb") as f:
+        for raw in f:
+            try:
+                rec = loads_json(raw)
+                user_id, item = str(rec["user_id"]), rec["item"]
+            except (ValueError, KeyError, TypeError) as e:
+                logging.warning(f"WP7 spill replay skipped bad line: {e}")
+                continue
+            try:
+                append_queue_item(user_id, item)
+                replayed += 1
+            except Exception as e:
+                logging.warning(f"WP7 spill replay append failed (kept for retry): {e}")
+                _spill_append(user_id, item, kind=".retry")
+    os.remove(claimed)
+    return replayed
+
+
+def _claim_and_replay(src: str) -> None:
+    name = os.path.basename(src)
+    claimed = f"{src.partition(_CLAIM_MARK)[0]}{_CLAIM_MARK}{_SPILL_TAG}"
+    try:
+        os.rename(src, claimed)  # atomic claim; another process may win the race
+    except OSError:
+        return
+    try:
+        replayed = _replay_spill_file(claimed)
+        if replayed:
+            logging.info(f"WP7 replayed {replayed} spilled queue item(s) from {name}")
+    except OSError as e:
+        logging.warning(f"WP7 spill replay failed for {name}: {e}")
+
+
+def _replay_orphaned_spills() -> None:
+    """Re-append items from spill files (and abandoned replay claims) whose owner is gone."""
+    try:
+        names = os.listdir(WP7_SPILL_DIR)
+    except OSError:
+        return
+    for name in names:
+        owner = _spill_owner(name)
+        if owner is None or not _owner_gone(owner):
+            continue
+        _claim_and_replay(os.path.join(WP7_SPILL_DIR, name))
+
+
+def _retry_failed_appends() -> None:
+    """Re-send this process's `.retry` spill; items that fail again are re-spilled."""
+    path = _spill_path(".retry")
+    if os.path.exists(path):
+        _claim_and_replay(path)
+
+
+def _append_pending(user_id: str, item: Dict[str, Any]) -> None:
+    try:
+        append_queue_item(user_id, item)
+    except Exception as e:
+        # Keep the item for a later retry; the main spill is truncated once drained.
+        logging.warning(f"WP7 background append failed (kept for retry): {e}")
+        _spill_append(user_id, item, kind=".retry")
+    finally:
+        _pending.task_done()
+    if _pending.empty():
+        _spill_truncate_if_drained()
+
+
+def _drain_pending() -> None:
+    try:
+        _replay_orphaned_spills()
+    except Exception as e:
+        # Replay is best-effort; the worker must keep draining new items regardless.
+        logging.warning(f"WP7 orphaned spill replay failed: {e}")
+    next_retry = time.monotonic() + WP7_RETRY_INTERVAL_SECONDS
+    while True:
+        try:
+            user_id, item = _pending.get(timeout=WP7_RETRY_INTERVAL_SECONDS)
+        except queue.Empty:
+            pass
+        else:
+            _append_pending(user_id, item)
+        if time.monotonic() >= next_retry:
+            try:
+                _retry_failed_appends()
+            except Exception as e:
+                logging.warning(f"WP7 retry of failed appends failed: {e}")
+            next_retry = time.monotonic() + WP7_RETRY_INTERVAL_SECONDS
+
+
+def _flush_pending_on_exit() -> None:
+    deadline = time.monotonic() + _SHUTDOWN_FLUSH_SECONDS
+    while _pending.unfinished_tasks and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+
+def _ensure_worker() -> None:
+    global _worker
+    if _worker is not None:
+        return
+    with _worker_lock:
+        if _worker is None:
+            worker = threading.Thread(target=_drain_pending, name="wp7-queue-append", daemon=True)
+            worker.start()
+            atexit.register(_flush_pending_on_exit)
+            _worker = worker
+
+
+def enqueue_queue_item(user_id: str, item: Dict[str, Any]) -> None:
+    """
+    Queue a WP7 item for a background append and return immediately.
+
+    Falls back to a synchronous `append_queue_item` when the in-memory buffer is full.
+    """
+    _ensure_worker()
+    with _spill_lock:
+        if _pending.full():
+            overflow = True
+        else:
+            _spill_append(user_id, item)
+            _pending.put_nowait((user_id, item))
+            overflow = False
+    if overflow:
+        append_queue_item(user_id, item)
+
+
+# Blob URLs already confirmed as Append Blobs in this process; appends to them skip the
+# existence probe and the migration planning.
+_append_ready: Set[str] = set()
+
+
 def _append_jsonl_line(client: BlobClient, line: str) -> None:
     """Append a JSONL line using Append Blob operations; migrate if blob exists as Block Blob."""
     data = line.encode("utf-8")
 
+    url = client.url
+    if url in _append_ready:
+        try:
+            client.append_block(data)
+            return
+        except (ResourceNotFoundError, HttpResponseError):
+            # Blob was deleted or replaced since we last saw it; re-run the full path below.
+            _append_ready.discard(url)
+
     # Create append blob if missing
     try:
         client.get_blob_properties()
@@ -258,6 +526,7 @@ def _append_jsonl_line(client: BlobClient, line: str) -> None:
 
     try:
         client.append_block(data)
+        _append_ready.add(url)
         return
     except HttpResponseError as e:
         # If the blob exists but is not an append blob (e.g. created earlier via upload_blob),
@@ -272,8 +541,8 @@ def _append_jsonl_line(client: BlobClient, line: str) -> None:
     except ResourceNotFoundError:
         existing = b""
 
-    merged = existing + data
-    client.upload_blob(merged, overwrite=True)
+    # Stream both chunks to the SDK instead of materializing `existing + data`.
+    client.upload_blob(iter((existing, data)), length=len(existing) + len(data), overwrite=True)
 
 
 def load_indexer_state(user_id: str) -> Dict[str, Any]:
@@ -290,7 +559,7 @@ def load_indexer_state(user_id: str) -> Dict[str, Any]:
             "updated_at_utc": utc_now_iso(),
         }
     try:
-        payload = json.loads(raw.decode("utf-8"))
+        payload = loads_json(raw)
         if not isinstance(payload, dict):
             raise ValueError("state is not an object")
         payload.setdefault("schema_version", WP7_STATE_SCHEMA_V1)
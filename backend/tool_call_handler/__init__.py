@@ -1,11 +1,16 @@
-import datetime
+import concurrent.futures
+import functools
+import itertools
 import json
 import logging
+import mmap
 import os
+import struct
 import sys
 import time
-from typing import Dict, Any, Tuple
+from typing import Callable, Dict, Any, Iterator, Mapping, Optional, Tuple
 import uuid
+from datetime import datetime as _dt
 
 try:
     import azure.functions as func
@@ -24,16 +29,100 @@ except ImportError:
     func = _types.SimpleNamespace(HttpResponse=lambda *a, **kw: None, HttpRequest=_DummyHttpRequest)
     AZURE_FUNCTIONS_AVAILABLE = False
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import threading
-from openai import OpenAI
+from cachetools import TTLCache
+import httpx
+from openai import APIError, APITimeoutError, OpenAI
 import inspect
-from types import SimpleNamespace
+from types import MappingProxyType, SimpleNamespace
 import types as _types
 import threading
 import random
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+try:
+    import orjson as _json_fast
+except ImportError:
+    _json_fast = None
+
+
+def _loads(data: Any) -> Any:
+    """json.loads via orjson when available; set `_json_fast = None` to force the stdlib path."""
+    if _json_fast is not None:
+        return _json_fast.loads(data)
+    return json.loads(data)
+
+
+def _dumps_bytes(obj: Any) -> bytes:
+    """UTF-8 JSON bytes (non-ASCII kept as-is, like ensure_ascii=False)."""
+    if _json_fast is not None:
+        return _json_fast.dumps(obj, default=str, option=_json_fast.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=str, ensure_ascii=False).encode("utf-8")
+
+
+def _body_snippet(resp: Any, limit: int, marker: str = "...[truncated]") -> str:
+    """First `limit` bytes of a response body as text; decodes only the slice, not the whole body."""
+    content = getattr(resp, "content", None) or b""
+    snippet = content[:limit].decode("utf-8", "replace")
+    return snippet + marker if len(content) > limit else snippet
+
+
+_JSON_BODY_START = (b"{", b"[")
+
+
+def _parse_response_body(resp: Any) -> Any:
+    """
+    Decode a function/proxy response: JSON when the Content-Type or the first byte says so,
+    otherwise `{"raw_response": text}` without running the parser on plain-text bodies.
+    """
+    content = resp.content or b""
+    ctype = (getattr(resp, "headers", None) or {}).get("content-type", "")
+    if "json" in ctype or content.lstrip()[:1] in _JSON_BODY_START:
+        try:
+            return _loads(content)
+        except ValueError:
+            pass
+    return {"raw_response": resp.text}
+
+
+def _dumps(obj: Any) -> str:
+    if _json_fast is not None:
+        return _json_fast.dumps(obj, default=str, option=_json_fast.OPT_NON_STR_KEYS).decode("utf-8")
+    return json.dumps(obj, default=str)
+
 # Allow importing shared helpers when running as a Functions app or locally
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# In-process tool registry, imported on first use (after the path setup above) and cached;
+# a None dispatcher means every tool goes through proxy_router.
+_DISPATCH_TOOL: Optional[Callable[..., Any]] = None
+_TOOL_REGISTRY: Mapping[str, Any] = {}
+_tools_loaded = False
+_tools_lock = threading.Lock()
+
+
+def _in_process_tools() -> Tuple[Optional[Callable[..., Any]], Mapping[str, Any]]:
+    """Return (dispatch_tool, tool_registry), importing `tools` once per process."""
+    global _DISPATCH_TOOL, _TOOL_REGISTRY, _tools_loaded
+    if not _tools_loaded:
+        with _tools_lock:
+            if not _tools_loaded:
+                try:
+                    from tools import dispatch_tool, tool_registry
+                    _DISPATCH_TOOL, _TOOL_REGISTRY = dispatch_tool, tool_registry
+                except Exception as exc:
+                    # Any failure inside a tool module only disables in-process dispatch.
+                    logging.warning("tools module not available for in-process dispatch: %s", exc)
+                _tools_loaded = True
+    return _DISPATCH_TOOL, _TOOL_REGISTRY
+
 try:
     from shared.file_logger import attach_file_handler, detach_file_handler
 except Exception:
@@ -47,75 +136,185 @@ ASSISTANT_ID = os.environ.get("OPENAI_ASSISTANT_ID", "")
 OPENAI_PROMPT_ID = os.environ.get("OPENAI_PROMPT_ID", "")
 LLM_RUNTIME_DEFAULT = os.environ.get("LLM_RUNTIME", "assistants")
 HANDLES_CACHE_TTL_SECONDS = int(os.environ.get("HANDLES_CACHE_TTL_SECONDS", "60") or 60)
+HANDLES_CACHE_MAX = int(os.environ.get("HANDLES_CACHE_MAX", "4096") or 4096)
+HANDLES_SAVE_WORKERS = int(os.environ.get("HANDLES_SAVE_WORKERS", "4") or 4)
+TOOL_CALL_WORKERS = int(os.environ.get("TOOL_CALL_WORKERS", "4") or 4)
 PROXY_URL = os.environ.get("AZURE_PROXY_URL", "")
 PROXY_FUNCTION_KEY = os.environ.get("FUNCTION_CODE_PROXY_ROUTER", "")
 ENABLE_SAVE_INTERACTION = True  # Hardcoded to always enable saving for now
 VECTOR_STORE_ID = os.environ.get("OPENAI_VECTOR_STORE_ID", "")
 DEBUG_TOOL_CALL_HANDLER = os.environ.get("DEBUG_TOOL_CALL_HANDLER", "").lower() in ("1", "true", "yes")
 OPENAI_MAX_REQUESTS = int(os.environ.get("OPENAI_MAX_REQUESTS", "0") or 0)
+_REST_HEADERS_PLAIN: Mapping[str, str] = MappingProxyType({"Authorization": f"Bearer {OPENAI_API_KEY}", "Content-Type": "application/json"})
+_REST_HEADERS_BETA: Mapping[str, str] = MappingProxyType({**_REST_HEADERS_PLAIN, "OpenAI-Beta": "assistants=v2"})
+# Short first-turn messages up to this length skip the Assistants run and use the
+# Responses runtime (requires OPENAI_PROMPT_ID). 0 disables the fast path.
+SIMPLE_TURN_MAX_CHARS = int(os.environ.get("SIMPLE_TURN_MAX_CHARS", "0") or 0)
+# Stream run events instead of polling runs.retrieve (set to 0 to force the polling path).
+# Opt-in: the polling path is the long-standing default (and the one with the REST runs.create fallback).
+OPENAI_RUN_STREAMING = os.environ.get("OPENAI_RUN_STREAMING", "0").lower() in ("1", "true", "yes")
+OPENAI_API_BASE = os.environ.get("OPENAI_API_BASE", "https://api.openai.com").rstrip("/")
+OPENAI_USE_REST_TOOLRESOURCES = os.environ.get("OPENAI_USE_REST_TOOLRESOURCES", "").lower() in ("1", "true", "yes")
 # runtime counter for outbound OpenAI HTTP calls (best-effort)
-_openai_lock = threading.Lock()
-_openai_count = 0
-_handles_cache: Dict[str, Dict[str, Any]] = {}
+_DEFAULT_FUNCTION_URL_BASE = "http://localhost:7071"
+
+
+def _resolve_env() -> None:
+    """Read the sibling-function URL settings once; save/restore paths use these constants."""
+    global _FUNCTION_URL_BASE, _SAVE_CODE, _RESTORE_CODE, _IS_LOCAL_BASE, _SAVE_URL, _RESTORE_URL
+    _FUNCTION_URL_BASE = (os.getenv("FUNCTION_URL_BASE") or "").strip().rstrip("/")
+    _SAVE_CODE = os.getenv("FUNCTION_CODE_SAVE_INTERACTION", "")
+    _RESTORE_CODE = os.getenv("FUNCTION_CODE_RESTORE_SESSION", "")
+    _IS_LOCAL_BASE = (not _FUNCTION_URL_BASE) or _FUNCTION_URL_BASE.startswith(("http://localhost", "http://127.0.0.1"))
+    # None: no remote save_interaction endpoint configured (the HTTP save is skipped).
+    _SAVE_URL = f"{_FUNCTION_URL_BASE}/api/save_interaction?code={_SAVE_CODE}" if _FUNCTION_URL_BASE and _SAVE_CODE else None
+    _RESTORE_URL = f"{_FUNCTION_URL_BASE or _DEFAULT_FUNCTION_URL_BASE}/api/restore_session"
+    if _RESTORE_CODE:
+        _RESTORE_URL = f"{_RESTORE_URL}?code={_RESTORE_CODE}"
+
+
+def refresh_env() -> None:
+    """
+    Re-read the cached function URL settings and rebuild the missing-config table
+    (tests, or after changing os.environ / module config in-process).
+    """
+    global _MISSING_ENV_VARS
+    _resolve_env()
+    _function_url.cache_clear()
+    _MISSING_ENV_VARS = _build_missing_env_vars()
+
+
+_resolve_env()
+# next() on itertools.count is atomic under the GIL, so no lock is needed.
+_openai_counter = itertools.count(1)
+# Bounded per-user handles cache; TTLCache is not thread-safe, hence the lock.
+_handles_cache: "TTLCache[str, Dict[str, Any]]" = TTLCache(maxsize=HANDLES_CACHE_MAX, ttl=HANDLES_CACHE_TTL_SECONDS or 1)
+_handles_cache_lock = threading.Lock()
+# Pooled workers for fire-and-forget handles.json saves.
+_save_executor = concurrent.futures.ThreadPoolExecutor(max_workers=HANDLES_SAVE_WORKERS, thread_name_prefix="handles-save")
+# Concurrent dispatch for turns that carry more than one tool call.
+_tool_executor = concurrent.futures.ThreadPoolExecutor(max_workers=TOOL_CALL_WORKERS, thread_name_prefix="tool-call")
+# Interaction logs are saved off the response path by a single worker: save_interaction rewrites
+# the user's whole log blob, so one writer keeps concurrent turns from overwriting each other.
+_interaction_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="interaction-log")
+# Latest unsaved handles per user; a user in `_handles_scheduled` already has a flush
+# task queued or running, so per-user writes never overlap and stale ones are dropped.
+_handles_pending: Dict[str, Dict[str, Any]] = {}
+_handles_scheduled: set = set()
+_handles_pending_lock = threading.Lock()
+
+# One keep-alive pool for the outbound REST calls (OpenAI REST fallbacks, proxy_router,
+# direct function calls). urllib3's Retry leaves POST out of status/read
+# retries by default, so only idempotent calls are retried on 5xx; connect failures
+# (request never sent) retry for any method.
+_SESSION = requests.Session()
+# Every body sent through the session is pre-encoded JSON (_dumps_bytes), so make it the default.
+_SESSION.headers.update({"Connection": "keep-alive", "Content-Type": "application/json"})
+_SESSION_ADAPTER = HTTPAdapter(
+    pool_connections=20,
+    pool_maxsize=100,
+    # raise_on_status=False hands the last 5xx back to raise_for_status() as before,
+    # instead of surfacing a RetryError the callers don't expect.
+    max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504], raise_on_status=False),
+)
+_SESSION.mount("https://", _SESSION_ADAPTER)
+_SESSION.mount("http://", _SESSION_ADAPTER)
+
+# Sibling-function client for the save_interaction / restore_session POSTs. With the optional
+# `h2` package installed, those requests multiplex over one HTTP/2 connection.
+try:
+    import h2  # noqa: F401
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+_SIBLING_CLIENT = httpx.Client(
+    http2=_HTTP2_AVAILABLE,
+    limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+    timeout=httpx.Timeout(10.0, connect=1.0),
+)
 
 # Optional global (cross-process) limit for tests. If set (>0), this will be
-# enforced by a simple file-based counter in `backend/logs/openai_global_counter.json`.
+# enforced by an 8-byte binary counter in `backend/logs/openai_global_counter.bin`.
 OPENAI_GLOBAL_MAX_REQUESTS = int(os.environ.get("OPENAI_GLOBAL_MAX_REQUESTS", "0") or 0)
 BACKEND_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-GLOBAL_COUNTER_PATH = os.path.join(BACKEND_ROOT, "logs", "openai_global_counter.json")
+GLOBAL_COUNTER_PATH = os.path.join(BACKEND_ROOT, "logs", "openai_global_counter.bin")
 GLOBAL_LOCK_PATH = GLOBAL_COUNTER_PATH + ".lock"
+_counter_mm = None
+
+# Cross-process lock: a persistent fd per lock file plus flock (POSIX) / msvcrt (Windows).
+# flock is per open file description, so threads in this process also share a Lock.
+_lock_fds: Dict[str, int] = {}
+_lock_fds_guard = threading.Lock()
+_file_lock_threads = threading.Lock()
+
+
+def _lock_fd(lock_path) -> int:
+    fd = _lock_fds.get(lock_path)
+    if fd is None:
+        with _lock_fds_guard:
+            fd = _lock_fds.get(lock_path)
+            if fd is None:
+                os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+                fd = os.open(lock_path, os.O_CREAT | os.O_RDWR)
+                _lock_fds[lock_path] = fd
+    return fd
+
 
 def _acquire_file_lock(lock_path, timeout=10.0):
-    start = time.time()
-    while True:
-        try:
-            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_RDWR)
-            try:
-                os.write(fd, str(os.getpid()).encode())
-            finally:
-                os.close(fd)
-            return True
-        except FileExistsError:
-            if (time.time() - start) > timeout:
-                raise RuntimeError("Timeout acquiring lock")
-            time.sleep(0.05)
+    if not _file_lock_threads.acquire(timeout=timeout):
+        raise RuntimeError("Timeout acquiring lock")
+    try:
+        fd = _lock_fd(lock_path)
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        else:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+    except BaseException:
+        _file_lock_threads.release()
+        raise
+    return True
 
 def _release_file_lock(lock_path):
     try:
-        os.remove(lock_path)
-    except Exception:
+        fd = _lock_fds.get(lock_path)
+        if fd is not None:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    except OSError:
         pass
+    finally:
+        _file_lock_threads.release()
+
+def _counter_map() -> mmap.mmap:
+    """Map the 8-byte little-endian counter file once per process (call with the file lock held)."""
+    global _counter_mm
+    if _counter_mm is None:
+        fd = os.open(GLOBAL_COUNTER_PATH, os.O_CREAT | os.O_RDWR)
+        try:
+            if os.fstat(fd).st_size < 8:
+                os.ftruncate(fd, 8)
+            _counter_mm = mmap.mmap(fd, 8)
+        finally:
+            os.close(fd)
+    return _counter_mm
 
 def _global_openai_call(fn, *args, **kwargs):
     """Enforce a cross-process global request counter for OpenAI calls.
-    This uses a file-based counter with a lock; intended only for local testing.
+    This uses a memory-mapped binary counter with a file lock; intended only for local testing.
     """
     if OPENAI_GLOBAL_MAX_REQUESTS <= 0:
         return fn(*args, **kwargs)
-    # ensure logs dir exists
-    try:
-        os.makedirs(os.path.dirname(GLOBAL_COUNTER_PATH), exist_ok=True)
-    except Exception:
-        pass
-    # acquire lock
     _acquire_file_lock(GLOBAL_LOCK_PATH, timeout=10.0)
     try:
-        if os.path.exists(GLOBAL_COUNTER_PATH):
-            try:
-                with open(GLOBAL_COUNTER_PATH, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-            except Exception:
-                data = {"count": 0}
-        else:
-            data = {"count": 0}
-        if data.get("count", 0) >= OPENAI_GLOBAL_MAX_REQUESTS:
+        mm = _counter_map()
+        count = struct.unpack_from("<Q", mm, 0)[0]
+        if count >= OPENAI_GLOBAL_MAX_REQUESTS:
             raise RuntimeError(f"OPENAI_GLOBAL_MAX_REQUESTS limit reached ({OPENAI_GLOBAL_MAX_REQUESTS})")
-        data["count"] = data.get("count", 0) + 1
-        try:
-            with open(GLOBAL_COUNTER_PATH, "w", encoding="utf-8") as f:
-                json.dump(data, f)
-        except Exception:
-            pass
+        struct.pack_into("<Q", mm, 0, count + 1)
     finally:
         _release_file_lock(GLOBAL_LOCK_PATH)
     return fn(*args, **kwargs)
@@ -125,16 +324,13 @@ def _openai_call(fn, *args, **kwargs):
     If `OPENAI_MAX_REQUESTS` is 0, no limit is enforced. After the limit is
     reached, raise RuntimeError to stop further network calls.
     """
-    global _openai_count
     # If a global cross-process limit is configured, use that wrapper.
     if OPENAI_GLOBAL_MAX_REQUESTS > 0:
         return _global_openai_call(fn, *args, **kwargs)
     if OPENAI_MAX_REQUESTS <= 0:
         return fn(*args, **kwargs)
-    with _openai_lock:
-        if _openai_count >= OPENAI_MAX_REQUESTS:
-            raise RuntimeError(f"OPENAI_MAX_REQUESTS limit reached ({OPENAI_MAX_REQUESTS})")
-        _openai_count += 1
+    if next(_openai_counter) > OPENAI_MAX_REQUESTS:
+        raise RuntimeError(f"OPENAI_MAX_REQUESTS limit reached ({OPENAI_MAX_REQUESTS})")
     return fn(*args, **kwargs)
 
 logging.info("=== tool_call_handler CONFIG ===")
@@ -143,108 +339,141 @@ logging.info(f"OPENAI_ASSISTANT_ID set: {bool(ASSISTANT_ID)}")
 logging.info(f"OPENAI_PROMPT_ID set: {bool(OPENAI_PROMPT_ID)}")
 logging.info(f"LLM_RUNTIME default: {LLM_RUNTIME_DEFAULT}")
 logging.info(f"HANDLES_CACHE_TTL_SECONDS: {HANDLES_CACHE_TTL_SECONDS}")
+logging.info(f"HANDLES_CACHE_MAX: {HANDLES_CACHE_MAX}")
+logging.info(f"HANDLES_SAVE_WORKERS: {HANDLES_SAVE_WORKERS}")
+logging.info(f"TOOL_CALL_WORKERS: {TOOL_CALL_WORKERS}")
+logging.info(f"OPENAI_RUN_STREAMING: {OPENAI_RUN_STREAMING}")
+logging.info(f"SIMPLE_TURN_MAX_CHARS: {SIMPLE_TURN_MAX_CHARS}")
 logging.info(f"AZURE_PROXY_URL set: {bool(PROXY_URL)}")
 logging.info(f"OPENAI_VECTOR_STORE_ID set: {bool(VECTOR_STORE_ID)}")
 logging.info("=== END CONFIG ===")
 
 
+# Characters a JSON document can start with; anything else (file names, ids) skips the parse attempt.
+_JSON_FIRST = frozenset('{["-0123456789tfn')
+
+
 def _parse_json_if_str(value: Any) -> Any:
     """If value is a JSON string, try to parse it; otherwise return as-is."""
     if isinstance(value, str):
+        if value.lstrip()[:1] not in _JSON_FIRST:
+            return value
         try:
-            return json.loads(value)
+            return _loads(value)
         except Exception:
             return value
     return value
 
 
+_BLOB_NAME_ALIASES = ("target_blob_name", "file_name", "blob_name", "name")
+
+def _basename(value: Any) -> Any:
+    """Strip any folder path the model put in front of a file name."""
+    if isinstance(value, str):
+        # Without a "/" rpartition returns the string itself as the tail.
+        return value.rpartition("/")[2]
+    return value
+
+
+# Per-tool alias tables: (output_key, aliases in priority order, transform or None).
+_NORMALIZATION_SPEC: Dict[str, Tuple[Tuple[str, Tuple[str, ...], Optional[Callable[[Any], Any]]], ...]] = {
+    "read_blob_file": (
+        ("file_name", ("file_name", "target_blob_name", "blob_name", "name"), _basename),
+    ),
+    "get_filtered_data": (
+        ("target_blob_name", _BLOB_NAME_ALIASES, None),
+        ("filter_key", ("find_key", "key_to_find", "key", "match_key"), None),
+        ("filter_value", ("find_value", "value_to_find", "value", "match_value"), None),
+        ("update_key", ("update_key", "set_key"), None),
+        ("update_value", ("update_value", "set_value"), _parse_json_if_str),
+    ),
+    "remove_data_entry": (
+        ("target_blob_name", _BLOB_NAME_ALIASES, None),
+        ("key_to_find", ("key_to_find", "find_key", "key"), None),
+        ("value_to_find", ("value_to_find", "find_value", "value"), None),
+    ),
+    "upload_data_or_file": (
+        ("target_blob_name", _BLOB_NAME_ALIASES, None),
+        ("file_content", ("file_content", "data", "content", "payload"), _parse_json_if_str),
+    ),
+    "manage_files": (
+        ("operation", ("operation", "action", "op"), None),
+        ("source_name", ("source_name", "from", "src"), _basename),
+        ("target_name", ("target_name", "to", "dest", "destination"), _basename),
+        ("prefix", ("prefix",), None),
+    ),
+    "save_interaction": (
+        ("user_message", ("user_message", "message"), None),
+        ("assistant_response", ("assistant_response", "response"), None),
+    ),
+}
+
+
+def _pop_first(args: Dict[str, Any], keys: Tuple[str, ...]) -> Any:
+    """Pop and return the first alias present with a non-empty value."""
+    for k in keys:
+        v = args.get(k)
+        if v is not None and v != "":
+            return args.pop(k)
+    return None
+
+
 def normalize_tool_arguments(tool_name: str, tool_arguments: Dict[str, Any]) -> Dict[str, Any]:
     """
     Normalize arguments coming from the assistant tools to the proxy_router schema.
+    Rewrites `tool_arguments` in place and returns it; callers pass a dict they own
+    (freshly parsed or built for this call).
     """
-    args = dict(tool_arguments or {})
-
-    def pop_first(*keys):
-        for k in keys:
-            if k in args and args[k] not in [None, ""]:
-                return args.pop(k)
-        return None
+    args = tool_arguments or {}
+    spec = _NORMALIZATION_SPEC.get(tool_name)
+    if not spec:
+        return args
+
+    for out_key, aliases, transform in spec:
+        val = _pop_first(args, aliases)
+        if val is None:
+            continue
+        args[out_key] = transform(val) if transform is not None else val
 
-    if tool_name == "read_blob_file":
-        file_name = pop_first("file_name", "target_blob_name", "blob_name", "name")
-        if file_name:
-            if "/" in file_name:
-                file_name = file_name.split("/")[-1]
-            args["file_name"] = file_name
-
-    elif tool_name == "get_filtered_data":
-        target_blob_name = pop_first("target_blob_name", "file_name", "blob_name", "name")
-        if target_blob_name:
-            args["target_blob_name"] = target_blob_name
-        find_key = pop_first("find_key", "key_to_find", "key", "match_key")
-        if find_key:
-            args["filter_key"] = find_key
-        find_value = pop_first("find_value", "value_to_find", "value", "match_value")
-        if find_value is not None:
-            args["filter_value"] = find_value
-        update_key = pop_first("update_key", "set_key")
-        if update_key:
-            args["update_key"] = update_key
-        update_value = pop_first("update_value", "set_value")
-        if update_value is not None:
-            args["update_value"] = _parse_json_if_str(update_value)
-
-    elif tool_name == "remove_data_entry":
-        target_blob_name = pop_first("target_blob_name", "file_name", "blob_name", "name")
-        if target_blob_name:
-            args["target_blob_name"] = target_blob_name
-        key_to_find = pop_first("key_to_find", "find_key", "key")
-        if key_to_find:
-            args["key_to_find"] = key_to_find
-        value_to_find = pop_first("value_to_find", "find_value", "value")
-        if value_to_find is not None:
-            args["value_to_find"] = value_to_find
-
-    elif tool_name == "upload_data_or_file":
-        target_blob_name = pop_first("target_blob_name", "file_name", "blob_name", "name")
-        if target_blob_name:
-            args["target_blob_name"] = target_blob_name
-        file_content = pop_first("file_content", "data", "content", "payload")
-        if file_content is not None:
-            args["file_content"] = _parse_json_if_str(file_content)
-
-    elif tool_name == "manage_files":
-        operation = pop_first("operation", "action", "op")
-        if operation:
-            args["operation"] = operation
-        source_name = pop_first("source_name", "from", "src")
-        if source_name:
-            if "/" in source_name:
-                source_name = source_name.split("/")[-1]
-            args["source_name"] = source_name
-        target_name = pop_first("target_name", "to", "dest", "destination")
-        if target_name:
-            if "/" in target_name:
-                target_name = target_name.split("/")[-1]
-            args["target_name"] = target_name
-        prefix = pop_first("prefix")
-        if prefix:
-            args["prefix"] = prefix
-
-    elif tool_name == "save_interaction":
-        user_message = pop_first("user_message", "message")
-        if user_message:
-            # Add timestamp prefix
-            from datetime import datetime
-            timestamp = datetime.utcnow().isoformat()
-            args["user_message"] = f"{timestamp};\n user: {user_message}"
-        assistant_response = pop_first("assistant_response", "response")
-        if assistant_response:
-            args["assistant_response"] = assistant_response
+    if tool_name == "save_interaction" and args.get("user_message"):
+        # Add timestamp prefix
+        timestamp = _dt.utcnow().isoformat()
+        args["user_message"] = f"{timestamp};\n user: {args['user_message']}"
 
     return args
 
 
+def _first_balanced_object(text: str) -> Optional[str]:
+    """
+    Return the first balanced {...} span in text, or None.
+    Braces inside JSON string literals are ignored, so trailing prose or a second object is never included.
+    """
+    start = text.find("{")
+    if start == -1:
+        return None
+    depth = 0
+    in_str = False
+    esc = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_str:
+            if esc:
+                esc = False
+            elif ch == "\\":
+                esc = True
+            elif ch == '"':
+                in_str = False
+        elif ch == '"':
+            in_str = True
+        elif ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                return text[start : i + 1]
+    return None
+
+
 def _safe_load_json(text: str) -> Dict[str, Any]:
     """
     Best-effort JSON loader for tool arguments. On failure, returns {} to avoid crashing the run.
@@ -252,34 +481,43 @@ def _safe_load_json(text: str) -> Dict[str, Any]:
     """
     if not text:
         return {}
-    try:
-        return json.loads(text)
-    except Exception:
+    if text.lstrip()[:1] in _JSON_FIRST:
+        try:
+            return _loads(text)
+        except Exception:
+            pass
+    candidate = _first_balanced_object(text)
+    if candidate is not None:
         try:
-            start = text.find("{")
-            end = text.rfind("}")
-            if start != -1 and end != -1 and end > start:
-                return json.loads(text[start : end + 1])
+            return _loads(candidate)
         except Exception:
             pass
-    logging.error(f"Failed to parse tool arguments as JSON: {text}")
+    logging.error("Failed to parse tool arguments as JSON: %s", text)
     return {}
 
 
+_SENSITIVE_KEYS = frozenset(map(sys.intern, (
+    "openai_api_key", "authorization", "api_key", "access_token", "x-functions-key", "code", "password",
+)))
+
+
 def _redact_sensitive(obj: Any) -> Any:
     """Redact common sensitive keys in dict-like objects for safe logging."""
-    if not isinstance(obj, dict):
+    # Raw text/list bodies have no keys to redact; they are logged as-is.
+    if not isinstance(obj, Mapping) or not obj:
         return obj
     redacted = {}
-    sensitive_keys = {"openai_api_key", "authorization", "api_key", "access_token", "x-functions-key", "code", "password"}
     for k, v in obj.items():
-        if k and k.lower() in sensitive_keys:
+        kl = (k if k.islower() else k.lower()) if isinstance(k, str) else k
+        if kl and kl in _SENSITIVE_KEYS:
             redacted[k] = "REDACTED"
         else:
             # avoid logging very large blobs
             try:
-                if isinstance(v, (str, bytes)) and len(str(v)) > 1000:
-                    redacted[k] = str(v)[:1000] + "...[truncated]"
+                if isinstance(v, str) and len(v) > 1000:
+                    redacted[k] = v[:1000] + "...[truncated]"
+                elif isinstance(v, bytes) and len(v) > 1000:
+                    redacted[k] = str(v[:1000]) + "...[truncated]"
                 else:
                     redacted[k] = v
             except Exception:
@@ -287,6 +525,42 @@ def _redact_sensitive(obj: Any) -> Any:
     return redacted
 
 
+class _LazyRedact:
+    """Defer `_redact_sensitive` until logging actually formats the record."""
+
+    __slots__ = ("obj",)
+
+    def __init__(self, obj: Any):
+        self.obj = obj
+
+    def __str__(self) -> str:
+        return str(_redact_sensitive(self.obj))
+
+    __repr__ = __str__
+
+
+# One OpenAI client per worker process: its httpx pool keeps TLS/keep-alive to the API
+# warm across invocations instead of being rebuilt and discarded on every request.
+_CLIENT: Optional[OpenAI] = None
+_CLIENT_LOCK = threading.Lock()
+
+
+def _get_client() -> OpenAI:
+    global _CLIENT
+    if _CLIENT is None:
+        with _CLIENT_LOCK:
+            if _CLIENT is None:
+                _CLIENT = OpenAI(
+                    api_key=OPENAI_API_KEY,
+                    http_client=httpx.Client(limits=httpx.Limits(max_connections=50, max_keepalive_connections=20)),
+                )
+    return _CLIENT
+
+
+# `inspect.signature` is expensive and the answer is fixed per SDK version.
+_tool_resources_support_cache: Dict[Any, bool] = {}
+
+
 def _supports_tool_resources(openai_client: OpenAI) -> bool:
     """Return True if the OpenAI client appears to support the `tool_resources` parameter
     on `beta.threads.runs.create`. Uses introspection to avoid making a network call.
@@ -296,19 +570,51 @@ def _supports_tool_resources(openai_client: OpenAI) -> bool:
         create_fn = getattr(openai_client.beta.threads.runs, "create", None)
         if create_fn is None:
             return False
+        # Bound methods are recreated on every attribute access; key on the underlying function.
+        cache_key = getattr(create_fn, "__func__", create_fn)
+        cached = _tool_resources_support_cache.get(cache_key)
+        if cached is not None:
+            return cached
         sig = inspect.signature(create_fn)
         # Parameters may include **kwargs; prefer explicit 'tool_resources' if present
-        if "tool_resources" in sig.parameters:
-            return True
-        # If **kwargs present, assume it may accept tool_resources at runtime
-        for p in sig.parameters.values():
-            if p.kind == inspect.Parameter.VAR_KEYWORD:
-                return True
-        return False
+        supported = "tool_resources" in sig.parameters or any(
+            # If **kwargs present, assume it may accept tool_resources at runtime
+            p.kind == inspect.Parameter.VAR_KEYWORD for p in sig.parameters.values()
+        )
+        _tool_resources_support_cache[cache_key] = supported
+        return supported
     except Exception:
         return False
 
 
+_runs_create_kw_cache: Dict[Any, Optional[str]] = {}
+
+
+def _runs_create_assistant_kw(openai_client: OpenAI) -> Optional[str]:
+    """Name of the assistant kwarg `runs.create` accepts (`assistant_id`, legacy `assistant`, or None).
+    Detected once per SDK function by introspection instead of probing with failing calls.
+    """
+    create_fn = openai_client.beta.threads.runs.create
+    cache_key = getattr(create_fn, "__func__", create_fn)
+    try:
+        return _runs_create_kw_cache[cache_key]
+    except KeyError:
+        pass
+    try:
+        params = inspect.signature(create_fn).parameters
+    except (TypeError, ValueError):
+        kw = "assistant_id"
+    else:
+        if "assistant_id" in params or any(p.kind == inspect.Parameter.VAR_KEYWORD for p in params.values()):
+            kw = "assistant_id"
+        elif "assistant" in params:
+            kw = "assistant"
+        else:
+            kw = None
+    _runs_create_kw_cache[cache_key] = kw
+    return kw
+
+
 def resolve_user_id(req, body: Dict[str, Any]) -> Tuple[Any, str]:
     """Resolve user_id from request headers, then body, then query params.
     Returns (user_id, source) where source is one of 'header', 'body', 'params', or 'none'.
@@ -318,16 +624,14 @@ def resolve_user_id(req, body: Dict[str, Any]) -> Tuple[Any, str]:
         if req is not None:
             try:
                 hdrs = getattr(req, 'headers', None) or {}
-                # Support both capitalized and lowercase keys
-                for hk in ('X-User-Id', 'x-user-id', 'X-User-Id'.lower()):
-                    if isinstance(hdrs, dict) and hk in hdrs and hdrs.get(hk):
-                        return str(hdrs.get(hk)), 'header'
-                    # Some HttpRequest implementations use a case-insensitive mapping
-                # Fallback: try get with case-insensitive search
-                if isinstance(hdrs, dict):
-                    for k, v in hdrs.items():
-                        if k and k.lower() == 'x-user-id' and v:
-                            return str(v), 'header'
+                # Azure's HttpRequestHeaders is already case-insensitive; plain dicts
+                # usually carry one of the two common spellings.
+                val = hdrs.get('x-user-id') or hdrs.get('X-User-Id')
+                if not val:
+                    # Fallback: lowercase the keys once for any other spelling
+                    val = {str(k).lower(): v for k, v in hdrs.items()}.get('x-user-id')
+                if val:
+                    return str(val), 'header'
             except Exception:
                 pass
         # Body
@@ -354,112 +658,156 @@ def resolve_runtime(body: Dict[str, Any]) -> str:
     return runtime
 
 
-def _missing_env_vars_for_runtime(runtime: str) -> list:
+def _is_simple_turn(user_message: str, body: Dict[str, Any]) -> bool:
+    """
+    True when an assistants-runtime turn may take the Responses fast path instead
+    (one synchronous call: no run polling, no messages.list). Opt-in via
+    SIMPLE_TURN_MAX_CHARS, since such turns are not appended to the Assistants thread.
+    Checks the request only; main() also requires that no thread is saved for the user.
+    """
+    if SIMPLE_TURN_MAX_CHARS <= 0 or _MISSING_ENV_VARS["responses"]:
+        return False
+    if body.get("runtime") or body.get("do_restore") or body.get("thread_id"):
+        # Explicit runtime choice, restore requests and ongoing threads stay on the Assistants path.
+        return False
+    # The caller still has to check storage: a saved thread means an ongoing conversation.
+    return 0 < len((user_message or "").strip()) <= SIMPLE_TURN_MAX_CHARS
+
+
+def _build_missing_env_vars() -> Dict[str, Tuple[str, ...]]:
+    base = tuple(k for k, v in (("OPENAI_API_KEY", OPENAI_API_KEY), ("AZURE_PROXY_URL", PROXY_URL)) if not v)
+    assistants = base + (() if ASSISTANT_ID else ("OPENAI_ASSISTANT_ID",))
+    responses = base + (() if OPENAI_PROMPT_ID else ("OPENAI_PROMPT_ID",))
+    return {
+        "": base,
+        "assistants": assistants,
+        "responses": responses,
+        # Everything required for both runtimes, listed to aid setup when auto can pick neither.
+        "auto": tuple(sorted(set(assistants + responses))),
+    }
+
+
+# Config is read once at import; Functions hosts restart the worker when app settings change.
+_MISSING_ENV_VARS = _build_missing_env_vars()
+
+
+def _missing_env_vars_for_runtime(runtime: str) -> Tuple[str, ...]:
+    """Memoized per process (see `_MISSING_ENV_VARS`); returns the shared tuple, not a copy."""
     runtime = (runtime or "").strip().lower()
-    missing = []
-    if not OPENAI_API_KEY:
-        missing.append("OPENAI_API_KEY")
-    if not PROXY_URL:
-        missing.append("AZURE_PROXY_URL")
-    if runtime == "assistants":
-        if not ASSISTANT_ID:
-            missing.append("OPENAI_ASSISTANT_ID")
-    elif runtime == "responses":
-        if not OPENAI_PROMPT_ID:
-            missing.append("OPENAI_PROMPT_ID")
-    return missing
+    return _MISSING_ENV_VARS.get(runtime, _MISSING_ENV_VARS[""])
+
+
+def _cache_handles(user_id: str, handles: Dict[str, Any]) -> None:
+    with _handles_cache_lock:
+        _handles_cache[str(user_id)] = handles
 
 
 def _load_handles(user_id: str) -> Dict[str, Any]:
     """Load `handles.json` from the user's blob namespace (best-effort)."""
     if HANDLES_CACHE_TTL_SECONDS > 0:
-        cached = _handles_cache.get(str(user_id))
-        if cached:
-            age = time.time() - cached.get("ts", 0)
-            if age <= HANDLES_CACHE_TTL_SECONDS:
-                if DEBUG_TOOL_CALL_HANDLER:
-                    logging.info(f"[DEBUG] handles cache hit user_id={user_id} age_s={age:.2f}")
-                return cached.get("data", {}) or {}
+        with _handles_cache_lock:
+            cached = _handles_cache.get(str(user_id))
+        if cached is not None:
             if DEBUG_TOOL_CALL_HANDLER:
-                logging.info(f"[DEBUG] handles cache expired user_id={user_id} age_s={age:.2f}")
-        elif DEBUG_TOOL_CALL_HANDLER:
+                logging.info(f"[DEBUG] handles cache hit user_id={user_id}")
+            return cached
+        if DEBUG_TOOL_CALL_HANDLER:
             logging.info(f"[DEBUG] handles cache miss user_id={user_id}")
     elif DEBUG_TOOL_CALL_HANDLER:
         logging.info("[DEBUG] handles cache disabled (TTL=0)")
-    try:
-        result_str, _info = execute_tool_call("read_blob_file", {"file_name": "handles.json"}, user_id)
-        payload = json.loads(result_str) if isinstance(result_str, str) else {}
-        if isinstance(payload, dict) and payload.get("status") == "success":
-            data = payload.get("data")
-            if isinstance(data, dict):
-                if HANDLES_CACHE_TTL_SECONDS > 0:
-                    _handles_cache[str(user_id)] = {"data": data, "ts": time.time()}
-                    if DEBUG_TOOL_CALL_HANDLER:
-                        logging.info(f"[DEBUG] handles cache set user_id={user_id} entries={len(data)}")
-                return data
-            if isinstance(data, str):
-                try:
-                    parsed = json.loads(data)
-                    if isinstance(parsed, dict):
-                        if HANDLES_CACHE_TTL_SECONDS > 0:
-                            _handles_cache[str(user_id)] = {"data": parsed, "ts": time.time()}
-                            if DEBUG_TOOL_CALL_HANDLER:
-                                logging.info(f"[DEBUG] handles cache set user_id={user_id} entries={len(parsed)}")
-                        return parsed
-                except Exception:
-                    return {}
-        if isinstance(payload, dict) and payload.get("error"):
-            error_text = str(payload.get("error") or "")
-            if "not found" in error_text.lower() or "blobnotfound" in error_text.lower():
-                if DEBUG_TOOL_CALL_HANDLER:
-                    logging.info(f"[DEBUG] handles.json missing; initializing user_id={user_id}")
-                _save_handles(user_id, {}, async_save=True)
-        return {}
-    except Exception:
+    # execute_tool_call_raw reports failures in its payload rather than raising.
+    payload, _info = execute_tool_call_raw("read_blob_file", {"file_name": "handles.json"}, user_id)
+    if not isinstance(payload, dict):
         return {}
+    if payload.get("status") == "success":
+        data = payload.get("data")
+        if isinstance(data, str):
+            try:
+                data = _loads(data)
+            except (ValueError, TypeError) as exc:
+                logging.warning("handles.json is not valid JSON user_id=%s: %s", user_id, exc)
+                return {}
+        if isinstance(data, dict):
+            if HANDLES_CACHE_TTL_SECONDS > 0:
+                _cache_handles(user_id, data)
+                if DEBUG_TOOL_CALL_HANDLER:
+                    logging.info(f"[DEBUG] handles cache set user_id={user_id} entries={len(data)}")
+            return data
+    if payload.get("error"):
+        error_text = str(payload.get("error") or "").lower()
+        if "not found" in error_text or "blobnotfound" in error_text:
+            if DEBUG_TOOL_CALL_HANDLER:
+                logging.info(f"[DEBUG] handles.json missing; initializing user_id={user_id}")
+            _save_handles(user_id, {}, async_save=True)
+    return {}
 
 
-def _save_handles(user_id: str, handles: Dict[str, Any], async_save: bool = False) -> None:
-    """Persist `handles.json` to the user's blob namespace (best-effort)."""
-    def _do_save():
+def _write_handles(user_id: str, handles: Dict[str, Any]) -> None:
+    # execute_tool_call_raw reports failures in `info` rather than raising.
+    _result, info = execute_tool_call_raw(
+        "upload_data_or_file",
+        {"target_blob_name": "handles.json", "file_content": handles or {}},
+        user_id,
+    )
+    if info.get("status") != "success":
+        logging.warning("handles save failed user_id=%s error=%s", user_id, info.get('error'))
+        return
+    if HANDLES_CACHE_TTL_SECONDS > 0:
+        _cache_handles(user_id, handles or {})
+    if DEBUG_TOOL_CALL_HANDLER:
+        logging.info(f"[DEBUG] handles save done user_id={user_id}")
+
+
+def _flush_pending_handles(user_id: str) -> None:
+    """Write the latest pending handles for user_id until none are left."""
+    while True:
+        with _handles_pending_lock:
+            handles = _handles_pending.pop(user_id, None)
+            if handles is None:
+                _handles_scheduled.discard(user_id)
+                return
         try:
-            execute_tool_call(
-                "upload_data_or_file",
-                {"target_blob_name": "handles.json", "file_content": handles or {}},
-                user_id,
-            )
-            if HANDLES_CACHE_TTL_SECONDS > 0:
-                _handles_cache[str(user_id)] = {"data": handles or {}, "ts": time.time()}
-            if DEBUG_TOOL_CALL_HANDLER:
-                logging.info(f"[DEBUG] handles async save done user_id={user_id}")
-        except Exception as exc:
-            if DEBUG_TOOL_CALL_HANDLER:
-                logging.info(f"[DEBUG] handles async save failed user_id={user_id} error={exc}")
+            _write_handles(user_id, handles)
+        except Exception:
+            # Worker boundary: keep draining so the user is never left marked as scheduled.
+            logging.exception(f"handles save crashed user_id={user_id}")
 
+
+def _save_handles(user_id: str, handles: Dict[str, Any], async_save: bool = False) -> None:
+    """Persist `handles.json` to the user's blob namespace (best-effort)."""
     if async_save:
         if DEBUG_TOOL_CALL_HANDLER:
             logging.info(f"[DEBUG] handles async save queued user_id={user_id}")
-        threading.Thread(target=_do_save, daemon=True).start()
+        with _handles_pending_lock:
+            _handles_pending[user_id] = handles
+            if user_id in _handles_scheduled:
+                return
+            _handles_scheduled.add(user_id)
+        _save_executor.submit(_flush_pending_handles, user_id)
         return
 
-    try:
-        _do_save()
-    except Exception:
-        pass
+    _write_handles(user_id, handles)
+
 
+def _utc_now_iso() -> str:
+    """UTC timestamp like `2025-01-31T12:00:00.123456Z`, formatted from time_ns without a datetime object."""
+    secs, nanos = divmod(time.time_ns(), 1_000_000_000)
+    return f"{time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(secs))}.{nanos // 1000:06d}Z"
 
-def _extract_response_function_calls(response: Any) -> list:
-    calls = []
-    for item in (getattr(response, "output", None) or []):
-        item_type = item.get("type") if isinstance(item, dict) else getattr(item, "type", None)
-        if item_type != "function_call":
+
+def _iter_function_calls(response: Any) -> Iterator[Dict[str, str]]:
+    """Yield `function_call` items from a Responses API output as plain dicts."""
+    for item in (getattr(response, "output", None) or ()):
+        if isinstance(item, dict):
+            get = item.get
+        else:
+            get = lambda k, _i=item: getattr(_i, k, None)
+        if get("type") != "function_call":
             continue
-        call_id = item.get("call_id") if isinstance(item, dict) else getattr(item, "call_id", None)
-        name = item.get("name") if isinstance(item, dict) else getattr(item, "name", None)
-        arguments = item.get("arguments") if isinstance(item, dict) else getattr(item, "arguments", None)
+        call_id = get("call_id")
+        name = get("name")
         if call_id and name:
-            calls.append({"call_id": str(call_id), "name": str(name), "arguments": str(arguments or "")})
-    return calls
+            yield {"call_id": str(call_id), "name": str(name), "arguments": str(get("arguments") or "")}
 
 
 def _coerce_conversation_id(value: Any) -> str:
@@ -478,6 +826,50 @@ def _coerce_conversation_id(value: Any) -> str:
         return ""
 
 
+# Read-only tools: safe to run concurrently, and identical calls within one batch can share a
+# single dispatch. Every other tool writes blobs (download, modify, overwrite without an ETag),
+# so two of them on the same blob must not overlap.
+_READ_ONLY_TOOLS = frozenset(("read_blob_file", "read_many_blobs", "list_blobs", "get_filtered_data", "get_interaction_history"))
+
+
+def _map_tool_calls(fn, items: list, names: list) -> list:
+    """
+    Apply `fn` to each item and return the results in order. Consecutive read-only calls run
+    concurrently on `_tool_executor`; any other tool runs inline as a barrier, so writes keep the
+    model's call order and reads after a write see it.
+    """
+    results: list = []
+    reads: list = []
+
+    def _flush_reads():
+        if len(reads) == 1:
+            results.append(fn(reads[0]))
+        elif reads:
+            results.extend(_tool_executor.map(fn, reads))
+        reads.clear()
+
+    for item, name in zip(items, names):
+        if name in _READ_ONLY_TOOLS:
+            reads.append(item)
+            continue
+        _flush_reads()
+        results.append(fn(item))
+    _flush_reads()
+    return results
+
+
+def _run_tool_calls(calls: list, user_id: str) -> list:
+    """
+    Execute one model turn's function calls, returning (call, (result_str, info)) in call order.
+    Read-only calls run concurrently (see `_map_tool_calls`); writes run one at a time.
+    """
+    def _run(call):
+        args = _safe_load_json(call.get("arguments") or "")
+        return execute_tool_call(call.get("name") or "", args, user_id)
+
+    return list(zip(calls, _map_tool_calls(_run, calls, [call.get("name") for call in calls])))
+
+
 def run_responses(openai_client: OpenAI, user_id: str, user_message: str, thread_id: str) -> Tuple[str, list, Dict[str, Any], str]:
     """Responses API deterministic tool loop using a Prompt ID (dual-runtime mode)."""
     if not thread_id:
@@ -534,7 +926,7 @@ def run_responses(openai_client: OpenAI, user_id: str, user_message: str, thread
                             "responses_conversation_id": conversation_id,
                             "responses_last_response_id": "",
                             "active_runtime": "responses",
-                            "updated_at": datetime.datetime.utcnow().isoformat() + "Z",
+                            "updated_at": _utc_now_iso(),
                         }
                         _save_handles(user_id, handles, async_save=True)
                 except Exception:
@@ -544,8 +936,17 @@ def run_responses(openai_client: OpenAI, user_id: str, user_message: str, thread
         previous_response_id = str(getattr(response, "id", "") or previous_response_id)
         conversation_id = _coerce_conversation_id(getattr(response, "conversation", None) or conversation_id)
 
-        function_calls = _extract_response_function_calls(response)
-        if not function_calls:
+        tool_outputs = []
+        for call, (result_str, info) in _run_tool_calls(list(_iter_function_calls(response)), user_id):
+            info = dict(info or {})
+            info["call_id"] = call.get("call_id")
+            info["runtime"] = "responses"
+            all_tool_calls.append(info)
+            tool_outputs.append(
+                {"type": "function_call_output", "call_id": call.get("call_id"), "output": str(result_str)}
+            )
+
+        if not tool_outputs:
             final_text = getattr(response, "output_text", None) or ""
             if not final_text:
                 final_text = "No response from assistant."
@@ -558,70 +959,85 @@ def run_responses(openai_client: OpenAI, user_id: str, user_message: str, thread
                         "responses_conversation_id": conversation_id,
                         "responses_last_response_id": previous_response_id,
                         "active_runtime": "responses",
-                        "updated_at": datetime.datetime.utcnow().isoformat() + "Z",
+                        "updated_at": _utc_now_iso(),
                     }
                     _save_handles(user_id, handles, async_save=True)
             except Exception:
                 pass
             return final_text, all_tool_calls, meta, thread_id
 
-        tool_outputs = []
-        for call in function_calls:
-            name = call.get("name") or ""
-            args = _safe_load_json(call.get("arguments") or "")
-            result_str, info = execute_tool_call(name, args, user_id)
-            info = dict(info or {})
-            info["call_id"] = call.get("call_id")
-            info["runtime"] = "responses"
-            all_tool_calls.append(info)
-            tool_outputs.append(
-                {"type": "function_call_output", "call_id": call.get("call_id"), "output": str(result_str)}
-            )
-
         current_input = tool_outputs
 
     raise RuntimeError("Responses tool loop exceeded max iterations")
 
 
-def restore_or_create_thread(openai_client: OpenAI, user_id: str, thread_id: str) -> str:
-    """Attempt to restore a thread_id for the user from blob storage; if not found,
-    create a new thread via the OpenAI SDK or REST fallback. Returns thread_id.
-    Raises RuntimeError on unrecoverable failure.
+def _response_body(resp: Any, default: Any = b"") -> Any:
+    """Body of an in-process HttpResponse: one getattr for `get_body`, then `.body`, then `default`."""
+    get_body = getattr(resp, "get_body", None)
+    if get_body is not None:
+        try:
+            return get_body()
+        except Exception:
+            pass
+    return getattr(resp, "body", default)
+
+
+class _BlobReadReq:
+    """Minimal HttpRequest stand-in for calling read_blob_file in-process."""
+
+    __slots__ = ("headers", "params", "_body")
+
+    def __init__(self, file_name: str, user_id: Any):
+        self.headers = {"x-user-id": str(user_id)}
+        self.params = {"file_name": file_name}
+        self._body = {"user_id": str(user_id), "file_name": file_name}
+
+    def get_json(self):
+        return self._body
+
+
+# OpenAI thread ids are `thread_` + alphanumerics, so plain formatting yields valid JSON.
+_THREAD_PAYLOAD_TEMPLATE = '{{"thread_id":"{tid}"}}'
+
+
+def _persist_thread_id(user_id: str, thread_id: str) -> None:
+    """Write the current_thread.json restore pointer for a newly minted thread (best-effort)."""
+    args = {"target_blob_name": "current_thread.json", "file_content": _THREAD_PAYLOAD_TEMPLATE.format(tid=thread_id)}
+    dispatch_tool, _registry = _in_process_tools()
+    try:
+        if dispatch_tool is not None:
+            # In-process upload: skips argument normalization and the JSON round-trip of the result.
+            try:
+                dispatch_tool("upload_data_or_file", args, user_id)
+                return
+            except Exception as exc:
+                logging.warning("In-process persist of current_thread.json failed: %s. Falling back to proxy_router.", exc)
+        execute_tool_call_raw("upload_data_or_file", args, user_id)
+    except Exception:
+        logging.warning("Failed to persist new thread id to blob storage")
+
+
+def _restore_thread_id(user_id: str) -> Optional[str]:
+    """
+    Look up the user's saved thread id in blob storage (current_thread.json, then the
+    interaction log). Returns None when there is none; never creates a thread.
     """
-    # Try restore from blob storage if no thread_id provided
-    if thread_id:
-        return thread_id
     try:
         if user_id:
             logging.info(f"Attempting to restore thread_id for user {user_id} from blob")
             try:
                 from backend.read_blob_file import main as read_blob_main
 
-                class _Req:
-                    def __init__(self, file_name, user_id):
-                        self.headers = {"x-user-id": str(user_id)}
-                        self.params = {"file_name": file_name}
-
-                    def get_json(self):
-                        return {"user_id": str(user_id), "file_name": file_name}
-
-                req_obj = _Req("current_thread.json", user_id)
+                req_obj = _BlobReadReq("current_thread.json", user_id)
                 resp = read_blob_main(req_obj)
+                resp_text = _response_body(resp, None)
                 try:
-                    resp_text = resp.get_body() if hasattr(resp, 'get_body') else getattr(resp, 'body', None)
-                except Exception:
-                    resp_text = getattr(resp, 'body', None)
-                try:
-                    res = json.loads(resp_text) if isinstance(resp_text, (str, bytes)) else resp_text
+                    res = _loads(resp_text) if isinstance(resp_text, (str, bytes)) else resp_text
                 except Exception:
                     res = resp_text
             except Exception:
-                # Fall back to the generic execute_tool_call which may proxy
-                res_str, info = execute_tool_call("read_blob_file", {"file_name": "current_thread.json"}, user_id)
-                try:
-                    res = json.loads(res_str) if isinstance(res_str, str) else res_str
-                except Exception:
-                    res = res_str
+                # Fall back to the generic tool path which may proxy
+                res, info = execute_tool_call_raw("read_blob_file", {"file_name": "current_thread.json"}, user_id)
             # Normalize and extract thread id
             tid = None
             if isinstance(res, dict):
@@ -634,16 +1050,12 @@ def restore_or_create_thread(openai_client: OpenAI, user_id: str, thread_id: str
             logging.info("No valid thread id found in current_thread.json; attempting fallback to interaction_logs.json")
             # Fallback: try to recover last thread_id from interaction_logs.json
             try:
-                res_str, info = execute_tool_call("read_blob_file", {"file_name": "interaction_logs.json"}, user_id)
-                try:
-                    rb = json.loads(res_str) if isinstance(res_str, str) else res_str
-                except Exception:
-                    rb = res_str
+                rb, info = execute_tool_call_raw("read_blob_file", {"file_name": "interaction_logs.json"}, user_id)
                 candidate = None
                 if isinstance(rb, dict) and 'data' in rb:
                     data_blob = rb.get('data')
                     try:
-                        candidate = json.loads(data_blob) if isinstance(data_blob, str) else data_blob
+                        candidate = _loads(data_blob) if isinstance(data_blob, str) else data_blob
                     except Exception:
                         candidate = data_blob
                 elif isinstance(rb, (list, dict)):
@@ -667,6 +1079,20 @@ def restore_or_create_thread(openai_client: OpenAI, user_id: str, thread_id: str
                 logging.info(f"Fallback restore from interaction_logs.json failed: {fb_ex}")
     except Exception as e:
         logging.info(f"Restore from blob failed or no file present: {e}")
+    return None
+
+
+def restore_or_create_thread(openai_client: OpenAI, user_id: str, thread_id: str) -> str:
+    """Attempt to restore a thread_id for the user from blob storage; if not found,
+    create a new thread via the OpenAI SDK or REST fallback. Returns thread_id.
+    Raises RuntimeError on unrecoverable failure.
+    """
+    # Try restore from blob storage if no thread_id provided
+    if thread_id:
+        return thread_id
+    restored = _restore_thread_id(user_id)
+    if restored:
+        return restored
 
     logging.info("No thread_id provided; attempting to create a new thread via OpenAI SDK")
     # Create via SDK (simplified single path)
@@ -676,62 +1102,57 @@ def restore_or_create_thread(openai_client: OpenAI, user_id: str, thread_id: str
         if not thread_id and isinstance(created, dict):
             thread_id = created.get("id") or created.get("thread_id")
         if not thread_id:
-            logging.warning(f"SDK thread create returned unexpected payload: {type(created)}")
+            logging.warning("SDK thread create returned unexpected payload: %s", type(created))
             raise RuntimeError("SDK thread creation returned no thread id")
         logging.info(f"Created new thread_id={thread_id} via SDK")
         # Persist the new thread id to blob storage for future restores
-        try:
-            if user_id:
-                logging.info(f"Saving new thread_id for user {user_id} to blob")
-                payload = {"thread_id": thread_id}
-                execute_tool_call("upload_data_or_file", {"target_blob_name": "current_thread.json", "file_content": json.dumps(payload)}, user_id)
-        except Exception:
-            logging.warning("Failed to persist new thread id to blob storage")
+        if user_id:
+            logging.info(f"Saving new thread_id for user {user_id} to blob")
+            _persist_thread_id(user_id, thread_id)
         return thread_id
     except Exception as sdk_exc:
-        logging.warning(f"SDK-based thread creation failed: {sdk_exc}; falling back to REST create")
+        logging.warning("SDK-based thread creation failed: %s; falling back to REST create", sdk_exc)
         # REST fallback
         try:
-            openai_api_base = os.environ.get("OPENAI_API_BASE", "https://api.openai.com").rstrip("/")
-            create_url = f"{openai_api_base}/v1/beta/threads"
+            create_url = f"{OPENAI_API_BASE}/v1/beta/threads"
             headers = _openai_rest_headers()
             payload = {"assistant_id": ASSISTANT_ID}
-            try:
-                use_rest_tr = os.environ.get("OPENAI_USE_REST_TOOLRESOURCES", "").lower() in ("1", "true", "yes")
-            except Exception:
-                use_rest_tr = False
-            if use_rest_tr and VECTOR_STORE_ID:
+            if OPENAI_USE_REST_TOOLRESOURCES and VECTOR_STORE_ID:
                 payload["tool_resources"] = {"vector_store": VECTOR_STORE_ID}
-            resp = requests.post(create_url, json=payload, headers=headers, timeout=15)
+            resp = _SESSION.post(create_url, data=_dumps_bytes(payload), headers=headers, timeout=15)
             try:
                 resp.raise_for_status()
             except requests.RequestException as exc:
-                body_snip = (resp.text[:1000] + "...[truncated]") if hasattr(resp, "text") else ""
-                logging.warning(f"Thread creation REST call failed: {exc} status={getattr(resp, 'status_code', 'n/a')} body={body_snip}")
+                body_snip = _body_snippet(resp, 1000)
+                logging.warning("Thread creation REST call failed: %s status=%s body=%s", exc, getattr(resp, 'status_code', 'n/a'), body_snip)
                 raise RuntimeError("failed to create thread")
             try:
-                thread_json = resp.json()
+                thread_json = _loads(resp.content)
             except ValueError:
                 raise RuntimeError("invalid response creating thread")
             thread_id = thread_json.get("id") or thread_json.get("thread_id")
             if not thread_id:
                 raise RuntimeError("thread creation returned no id")
             logging.info(f"Created new thread_id={thread_id} via REST")
-            try:
-                if user_id:
-                    logging.info(f"Saving new thread_id for user {user_id} to blob (REST-created)")
-                    payload = {"thread_id": thread_id}
-                    execute_tool_call("upload_data_or_file", {"target_blob_name": "current_thread.json", "file_content": json.dumps(payload)}, user_id)
-            except Exception:
-                logging.warning("Failed to persist new thread id to blob storage (REST-created)")
+            if user_id:
+                logging.info(f"Saving new thread_id for user {user_id} to blob (REST-created)")
+                _persist_thread_id(user_id, thread_id)
             return thread_id
         except Exception as e:
             logging.exception(f"Unexpected error while creating thread via REST: {e}")
             raise RuntimeError(f"failed to create thread: {e}")
 
 
+# REST messages endpoint templates, tried in order; the last one that worked is moved to the front.
+_MESSAGES_URL_SUFFIXES = ("/v1/threads/{tid}/messages", "/v1/beta/threads/{tid}/messages")
+_LAST_GOOD_MESSAGES_SUFFIX: Optional[str] = None
+
+
 def append_user_message(openai_client: OpenAI, thread_id: str, user_message: str):
-    """Append user's message to the given thread. Uses SDK when possible, otherwise REST fallback."""
+    """Append user's message to the given thread. Uses SDK when possible, otherwise REST fallback.
+    `openai_client` is expected to be the shared `_get_client()` instance.
+    """
+    global _LAST_GOOD_MESSAGES_SUFFIX
     if not user_message:
         return
     try:
@@ -745,36 +1166,40 @@ def append_user_message(openai_client: OpenAI, thread_id: str, user_message: str
     except Exception as msg_sdk_exc:
         try:
             logging.info(f"SDK message create failed ({msg_sdk_exc}); falling back to REST POST for thread {thread_id}")
-            openai_api_base = os.environ.get("OPENAI_API_BASE", "https://api.openai.com").rstrip("/")
-            candidate_urls = [
-                f"{openai_api_base}/v1/threads/{thread_id}/messages",
-                f"{openai_api_base}/v1/beta/threads/{thread_id}/messages",
-            ]
+            suffixes = _MESSAGES_URL_SUFFIXES
+            last_good = _LAST_GOOD_MESSAGES_SUFFIX
+            if last_good:
+                suffixes = (last_good,) + tuple(sfx for sfx in suffixes if sfx != last_good)
             headers = _openai_rest_headers()
             payload = {"role": "user", "content": [{"type": "text", "text": user_message}]}
             resp_msg = None
             success = False
-            for msg_url in candidate_urls:
+            for suffix in suffixes:
+                msg_url = OPENAI_API_BASE + suffix.format(tid=thread_id)
                 try:
                     if DEBUG_TOOL_CALL_HANDLER:
-                        logging.info(f"[DEBUG] REST POST {msg_url} headers={_redact_sensitive(dict(headers))} payload={_redact_sensitive(payload)}")
-                    resp_msg = requests.post(msg_url, json=payload, headers=headers, timeout=10)
+                        logging.info("[DEBUG] REST POST %s headers=%s payload=%s", msg_url, _LazyRedact(headers), _LazyRedact(payload))
+                    resp_msg = _SESSION.post(msg_url, data=_dumps_bytes(payload), headers=headers, timeout=10)
                     resp_msg.raise_for_status()
                     logging.info(f"Posted user message to thread {thread_id} via REST; status={resp_msg.status_code} url={msg_url}")
+                    _LAST_GOOD_MESSAGES_SUFFIX = suffix
                     success = True
                     break
                 except requests.RequestException as rme:
                     try:
-                        body_text = resp_msg.text[:1000] if resp_msg is not None and hasattr(resp_msg, 'text') else ''
+                        body_text = _body_snippet(resp_msg, 1000)
                     except Exception:
                         body_text = '<unserializable>'
                     logging.warning(
-                        f"Failed to POST message to thread {thread_id} via REST: status={getattr(resp_msg, 'status_code', 'n/a')} url={msg_url} error={rme} body={body_text} headers={_redact_sensitive(dict(headers))} payload_trunc={_redact_sensitive(payload)}"
+                        "Failed to POST message to thread %s via REST: status=%s url=%s error=%s body=%s",
+                        thread_id, getattr(resp_msg, 'status_code', 'n/a'), msg_url, rme, body_text,
                     )
+                    if DEBUG_TOOL_CALL_HANDLER:
+                        logging.info("[DEBUG] failed REST POST headers=%s payload=%s", _LazyRedact(headers), _LazyRedact(payload))
             if not success:
-                logging.warning(f"REST fallback for posting message failed for all candidate URLs for thread {thread_id}")
+                logging.warning("REST fallback for posting message failed for all candidate URLs for thread %s", thread_id)
         except Exception as rest_exc:
-            logging.warning(f"REST fallback for posting message failed: {rest_exc}")
+            logging.warning("REST fallback for posting message failed: %s", rest_exc)
 
 
 def handle_direct_actions(req, body: Dict[str, Any], action: str, user_id: str):
@@ -789,7 +1214,7 @@ def handle_direct_actions(req, body: Dict[str, Any], action: str, user_id: str):
     if not user_id_local:
         return _make_response({"error": "user_id is required for save/get actions"}, status_code=400)
     headers = {"X-User-Id": str(user_id_local), "Content-Type": "application/json"}
-    base = os.getenv("FUNCTION_URL_BASE", "http://localhost:7071").rstrip("/")
+    base = _FUNCTION_URL_BASE or _DEFAULT_FUNCTION_URL_BASE
     url = f"{base}/api/{action}"
     function_code_env = f"FUNCTION_CODE_{action.upper()}"
     function_code = os.getenv(function_code_env)
@@ -797,22 +1222,19 @@ def handle_direct_actions(req, body: Dict[str, Any], action: str, user_id: str):
         url = f"{url}?code={function_code}"
     try:
         if DEBUG_TOOL_CALL_HANDLER:
-            logging.info(f"[DEBUG] Direct call {action} URL={url} params={_redact_sensitive(dict(params))} headers={_redact_sensitive(dict(headers))}")
+            logging.info("[DEBUG] Direct call %s URL=%s params=%s headers=%s", action, url, _LazyRedact(params), _LazyRedact(headers))
         if action == "get_interaction_history":
-            resp = requests.get(url, params=params, headers=headers, timeout=45)
+            resp = _SESSION.get(url, params=params, headers=headers, timeout=45)
         else:
-            resp = requests.post(url, json=params, headers=headers, timeout=45)
+            resp = _SESSION.post(url, data=_dumps_bytes(params), headers=headers, timeout=45)
         resp.raise_for_status()
-        try:
-            result = resp.json()
-        except ValueError:
-            result = {"raw_response": resp.text}
+        result = _parse_response_body(resp)
         if DEBUG_TOOL_CALL_HANDLER:
             try:
-                snippet = result if isinstance(result, (dict, list)) else (resp.text[:1000] + "...[truncated]" if len(resp.text) > 1000 else resp.text)
+                snippet = result if isinstance(result, (dict, list)) else _body_snippet(resp, 1000)
             except Exception:
                 snippet = "<unserializable>"
-            logging.info(f"[DEBUG] Direct response status={resp.status_code} body={_redact_sensitive(snippet if isinstance(snippet, dict) else {'raw': snippet})}")
+            logging.info("[DEBUG] Direct response status=%s body=%s", resp.status_code, _LazyRedact(snippet))
         return _make_response({"status": "success", "result": result}, status_code=resp.status_code)
     except requests.HTTPError as exc:
         if resp is not None:
@@ -823,41 +1245,272 @@ def handle_direct_actions(req, body: Dict[str, Any], action: str, user_id: str):
             return _make_response({"error": str(exc)}, status_code=500)
 
 
+def _parse_required_tool_calls(tool_calls: list) -> list:
+    """Parse each `requires_action` call's arguments once; returns [(call, name, args)]."""
+    parsed = []
+    for call in tool_calls:
+        fn = getattr(call, 'function', None)
+        name = getattr(fn, 'name', None) or getattr(fn, 'function_name', None)
+        parsed.append((call, name, _safe_load_json(getattr(fn, 'arguments', None) or "{}")))
+    return parsed
+
+
+def _log_required_tool_calls(parsed_calls: list) -> None:
+    # Log required tool calls summary (name + arguments) for quick visibility
+    logging.info("requires_action_tool_calls=%s", [{"name": name, "args": _LazyRedact(args)} for _call, name, args in parsed_calls])
+
+
+def _execute_required_tool_call(call: Any, name: Optional[str], args: Any, user_id: str, thread_id: str) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """
+    Run one Assistants `requires_action` tool call with its already-parsed arguments.
+    Returns (output_entry, info); info is None when the call raised before producing a result.
+    """
+    try:
+        if name == "manage_files" and args.get("operation") == "list":
+            name = "list_blobs"
+            args = {"prefix": args.get("prefix")}
+        call_start = time.perf_counter()
+        try:
+            # Copy: the parsed args are shared with the requires_action log summary.
+            args = dict(args or {})
+        except Exception:
+            args = args or {}
+        if args.get("user_id") and args.get("user_id") != user_id:
+            logging.info(f"Overriding tool arg user_id={args.get('user_id')} -> {user_id}")
+        args["user_id"] = user_id
+        if "thread_id" in args and args.get("thread_id") != thread_id:
+            logging.info(f"Overriding tool arg thread_id={args.get('thread_id')} -> {thread_id}")
+        if thread_id:
+            args["thread_id"] = thread_id
+
+        # Structured result: encoded exactly once, when the outputs are submitted.
+        parsed_output, info = execute_tool_call_raw(name, args, user_id)
+        call_end = time.perf_counter()
+        return {
+            "tool_call_id": getattr(call, 'id', None),
+            "name": name,
+            "arguments": args,
+            "output": parsed_output,
+            "info": info,
+            "duration_ms": (call_end - call_start) * 1000,
+        }, info
+    except Exception as call_exc:
+        if DEBUG_TOOL_CALL_HANDLER:
+            logging.exception(f"Error executing tool call {name}: {call_exc}")
+        return {"tool_call_id": getattr(call, 'id', None), "name": name, "error": str(call_exc)}, None
+
+
+def _read_only_call_key(name: Optional[str], args: Any) -> Optional[str]:
+    if name not in _READ_ONLY_TOOLS or not isinstance(args, dict):
+        return None
+    try:
+        if _json_fast is not None:
+            return name + _json_fast.dumps(args, default=str, option=_json_fast.OPT_SORT_KEYS | _json_fast.OPT_NON_STR_KEYS).decode("utf-8")
+        return name + json.dumps(args, sort_keys=True, default=str)
+    except (TypeError, ValueError):
+        return None
+
+
+def _execute_required_tool_calls(parsed_calls: list, user_id: str, thread_id: str) -> list:
+    """
+    Run a parsed `requires_action` batch; results stay in call order. Read-only calls run
+    concurrently, writes one at a time (see `_map_tool_calls`). Repeated read-only calls with
+    identical arguments and no write in between are dispatched once and the result is fanned
+    out to each tool_call_id.
+    """
+    if len(parsed_calls) <= 1:
+        return [_execute_required_tool_call(*p, user_id, thread_id) for p in parsed_calls]
+
+    unique: list = []
+    slot_of_key: Dict[str, int] = {}
+    slots = []
+    for parsed in parsed_calls:
+        if parsed[1] not in _READ_ONLY_TOOLS:
+            # A write may change what an earlier identical read returned.
+            slot_of_key.clear()
+        key = _read_only_call_key(parsed[1], parsed[2])
+        if key is not None and key in slot_of_key:
+            slots.append(slot_of_key[key])
+            continue
+        if key is not None:
+            slot_of_key[key] = len(unique)
+        slots.append(len(unique))
+        unique.append(parsed)
+
+    results = _map_tool_calls(lambda p: _execute_required_tool_call(*p, user_id, thread_id), unique, [p[1] for p in unique])
+    if len(unique) == len(parsed_calls):
+        return results
+    out = []
+    for (call, _name, _args), slot in zip(parsed_calls, slots):
+        output, info = results[slot]
+        call_id = getattr(call, 'id', None)
+        if output.get("tool_call_id") != call_id:
+            output = dict(output, tool_call_id=call_id)
+        out.append((output, info))
+    return out
+
+
+def _tool_outputs_payload(outputs: list) -> list:
+    return [
+        {"tool_call_id": o.get('tool_call_id'), "output": _dumps(o.get('output')) if not isinstance(o.get('output'), str) else o.get('output')}
+        for o in outputs
+    ]
+
+
+class _RunSummary:
+    """Per-run bookkeeping (wall-clock timestamps and step records); `to_dict()` for serialization."""
+
+    __slots__ = ("timestamps", "steps", "mode")
+
+    def __init__(self, mode: Optional[str] = None):
+        self.timestamps: Dict[str, float] = {}
+        self.steps: list = []
+        self.mode = mode
+
+    def to_dict(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"timestamps": self.timestamps, "steps": self.steps}
+        if self.mode is not None:
+            out["mode"] = self.mode
+        return out
+
+
+class _RunStreamUnsupported(Exception):
+    """Streaming is unavailable or failed before a run existed; nothing was created server-side, so polling is safe."""
+
+
+class _RunStreamTimeout(Exception):
+    """The overall run deadline passed while events were still arriving."""
+
+
+# Hard limit on waiting for a run to finish, shared by the streaming and polling paths.
+_RUN_MAX_WAIT_S = 30
+
+
+def _cancel_run_quietly(openai_client: OpenAI, thread_id: str, run: Any) -> None:
+    """Best-effort cancel of a run we stopped waiting for, so it does not keep executing."""
+    run_id = getattr(run, "id", None)
+    if not run_id:
+        return
+    try:
+        _openai_call(openai_client.beta.threads.runs.cancel, thread_id=thread_id, run_id=run_id)
+    except Exception as exc:
+        logging.warning("Failed to cancel timed-out run %s: %s", run_id, exc)
+
+
+def _stream_run(openai_client: OpenAI, thread_id: str, user_id: str):
+    """
+    Create a run with the SDK's streaming API and react to server-sent state changes
+    instead of polling `runs.retrieve`. Same return shape as `create_run_and_poll`.
+    """
+    all_tool_calls = []
+    tool_outputs_struct = []
+    run_summary = _RunSummary(mode="stream")
+    # One deadline across every stream of this run (tool rounds included), as in polling.
+    # Each stream's read timeout is the time left, so a run stuck in queued/in_progress
+    # that stops sending events cannot block past it either.
+    deadline = time.monotonic() + _RUN_MAX_WAIT_S
+    try:
+        manager = _openai_call(openai_client.beta.threads.runs.stream, thread_id=thread_id, assistant_id=ASSISTANT_ID, timeout=_RUN_MAX_WAIT_S)
+    except (TypeError, AttributeError) as exc:
+        raise _RunStreamUnsupported(str(exc))
+
+    run = None
+    while manager is not None:
+        next_manager = None
+        try:
+            with manager as stream:
+                for event in stream:
+                    if time.monotonic() > deadline:
+                        raise _RunStreamTimeout()
+                    kind = getattr(event, "event", "") or ""
+                    data = getattr(event, "data", None)
+                    if kind.startswith("thread.run.") and not kind.startswith("thread.run.step"):
+                        run = data
+                        run_summary.timestamps["last_event"] = time.time()
+                    if kind == "thread.run.requires_action":
+                        tool_calls = getattr(getattr(getattr(data, 'required_action', None), 'submit_tool_outputs', None), 'tool_calls', None) or []
+                        logging.info(f"run_status=requires_action tool_calls={len(tool_calls)}")
+                        parsed_calls = _parse_required_tool_calls(tool_calls)
+                        _log_required_tool_calls(parsed_calls)
+                        outputs = []
+                        run_summary.timestamps["tools_start"] = time.time()
+                        for output, info in _execute_required_tool_calls(parsed_calls, user_id, thread_id):
+                            outputs.append(output)
+                            if info is not None:
+                                all_tool_calls.append(info)
+                                tool_outputs_struct.append(output)
+                        run_summary.timestamps["tools_end"] = time.time()
+                        run_summary.steps.append({"step": "tools", "count": len(outputs), "outputs": outputs})
+                        # The server closes this stream after requires_action; results continue on a new one.
+                        next_manager = _openai_call(
+                            openai_client.beta.threads.runs.submit_tool_outputs_stream,
+                            thread_id=thread_id,
+                            run_id=data.id,
+                            tool_outputs=_tool_outputs_payload(outputs),
+                            timeout=max(1.0, deadline - time.monotonic()),
+                        )
+                        break
+                    if kind == "thread.run.completed":
+                        run_summary.timestamps["completed"] = time.time()
+                    elif kind in ("thread.run.failed", "thread.run.cancelled", "thread.run.expired", "thread.run.incomplete"):
+                        if DEBUG_TOOL_CALL_HANDLER:
+                            logging.error("Run ended with %s: %s", kind, getattr(data, 'last_error', None))
+                        raise RuntimeError(str(getattr(data, 'last_error', None) or kind))
+                    elif kind == "error":
+                        raise RuntimeError(f"Run stream error: {data}")
+        except (_RunStreamTimeout, httpx.TimeoutException, APITimeoutError):
+            _cancel_run_quietly(openai_client, thread_id, run)
+            raise RuntimeError("Run stream timed out") from None
+        except APIError as exc:
+            if run is not None:
+                raise
+            # No run event yet, so nothing was created server-side: runs.create + poll is safe.
+            raise _RunStreamUnsupported(f"runs.stream failed: {exc}") from exc
+        manager = next_manager
+
+    if getattr(run, "status", None) != "completed":
+        raise RuntimeError(f"Run stream ended with status={getattr(run, 'status', None)}")
+    logging.info("run_status=completed")
+    return run, all_tool_calls, tool_outputs_struct, run_summary
+
+
+# Precomputed unit jitter fractions, cycled by the poll loop instead of drawing per iteration.
+_POLL_JITTER = itertools.cycle([random.random() for _ in range(32)])
+
+
 def create_run_and_poll(openai_client: OpenAI, thread_id: str, user_id: str):
     """Create a run and poll until completion. Returns (run, all_tool_calls, tool_outputs_struct, run_summary).
-    Raises exceptions on unrecoverable failures.
+    Raises exceptions on unrecoverable failures. `openai_client` is expected to be the shared
+    `_get_client()` instance.
     """
+    if OPENAI_RUN_STREAMING:
+        try:
+            return _stream_run(openai_client, thread_id, user_id)
+        except _RunStreamUnsupported as exc:
+            logging.warning("Run streaming unavailable (%s); falling back to polling", exc)
+
     run = None
     all_tool_calls = []
     tool_outputs_struct = []
-    run_summary = {"timestamps": {}, "steps": []}
+    run_summary = _RunSummary()
 
     # Create a normal run (no tool_resources attachment)
     try:
-        try:
-            run = _openai_call(openai_client.beta.threads.runs.create, thread_id=thread_id, assistant_id=ASSISTANT_ID)
-        except TypeError:
-            try:
-                run = _openai_call(openai_client.beta.threads.runs.create, thread_id=thread_id, assistant=ASSISTANT_ID)
-            except TypeError:
-                run = _openai_call(openai_client.beta.threads.runs.create, thread_id=thread_id)
+        assistant_kw = _runs_create_assistant_kw(openai_client)
+        create_kwargs = {assistant_kw: ASSISTANT_ID} if assistant_kw else {}
+        run = _openai_call(openai_client.beta.threads.runs.create, thread_id=thread_id, **create_kwargs)
     except Exception as exc:
-        logging.warning(f"SDK runs.create failed: {exc}; attempting REST fallback for run creation")
+        logging.warning("SDK runs.create failed: %s; attempting REST fallback for run creation", exc)
         try:
-            openai_api_base = os.environ.get("OPENAI_API_BASE", "https://api.openai.com").rstrip("/")
-            runs_url = f"{openai_api_base}/v1/beta/threads/{thread_id}/runs"
+            runs_url = f"{OPENAI_API_BASE}/v1/beta/threads/{thread_id}/runs"
             headers = _openai_rest_headers()
             payload = {"assistant_id": ASSISTANT_ID}
-            try:
-                use_rest_tr = os.environ.get("OPENAI_USE_REST_TOOLRESOURCES", "").lower() in ("1", "true", "yes")
-            except Exception:
-                use_rest_tr = False
-            if use_rest_tr and VECTOR_STORE_ID:
+            if OPENAI_USE_REST_TOOLRESOURCES and VECTOR_STORE_ID:
                 payload["tool_resources"] = {"vector_store": VECTOR_STORE_ID}
-            resp = requests.post(runs_url, json=payload, headers=headers, timeout=15)
+            resp = _SESSION.post(runs_url, data=_dumps_bytes(payload), headers=headers, timeout=15)
             resp.raise_for_status()
             try:
-                run_json = resp.json()
+                run_json = _loads(resp.content)
             except ValueError:
                 logging.warning("REST runs.create returned non-JSON response")
                 raise RuntimeError("REST runs.create returned non-JSON response")
@@ -874,15 +1527,14 @@ def create_run_and_poll(openai_client: OpenAI, thread_id: str, user_id: str):
             raise
 
     # Polling with progressive backoff+jitter to avoid hammering the API.
-    poll_start = time.time()
-    max_poll_s = 30  # hard timeout for polling
+    poll_start = time.monotonic()  # deadline only; immune to wall-clock jumps
     poll_delay = 0.15
     max_delay = 1.0
     backoff_factor = 1.5
     prev_status = None
     while True:
         run = _openai_call(openai_client.beta.threads.runs.retrieve, thread_id=thread_id, run_id=run.id)
-        run_summary["timestamps"]["last_poll"] = time.time()
+        run_summary.timestamps["last_poll"] = time.time()
         try:
             rs = getattr(run, 'status', None)
             logging.info(f"run_status={rs}")
@@ -892,99 +1544,94 @@ def create_run_and_poll(openai_client: OpenAI, thread_id: str, user_id: str):
             poll_delay = 0.15
         prev_status = rs
         if run.status == "completed":
-            run_summary["timestamps"]["completed"] = time.time()
+            run_summary.timestamps["completed"] = time.time()
             break
         if run.status == "failed":
             if DEBUG_TOOL_CALL_HANDLER:
-                logging.error(f"Run failed: {getattr(run, 'last_error', None)}")
+                logging.error("Run failed: %s", getattr(run, 'last_error', None))
             raise RuntimeError(str(getattr(run, 'last_error', 'run failed')))
         if run.status == "requires_action":
-            # Log required tool calls summary (name + arguments) for quick visibility
-            try:
-                tool_calls_tmp = getattr(getattr(run, 'required_action', _types.SimpleNamespace()), 'submit_tool_outputs', _types.SimpleNamespace())
-                tool_calls_list = getattr(tool_calls_tmp, 'tool_calls', [])
-                brief_calls = []
-                for c in tool_calls_list:
-                    nm = getattr(c.function, 'name', None) or getattr(c.function, 'function_name', None)
-                    raw_args = getattr(c.function, 'arguments', None) or "{}"
-                    args_parsed = _safe_load_json(raw_args or "{}")
-                    brief_calls.append({"name": nm, "args": _redact_sensitive(args_parsed)})
-                logging.info(f"requires_action_tool_calls={brief_calls}")
-            except Exception:
-                logging.debug("Failed to log required action tool calls summary")
-
-            # Execute required tool calls
             tool_calls = getattr(getattr(run, 'required_action', _types.SimpleNamespace()), 'submit_tool_outputs', _types.SimpleNamespace())
             tool_calls = getattr(tool_calls, 'tool_calls', [])
+            # Parse arguments once; the summary log and execution share the result.
+            parsed_calls = _parse_required_tool_calls(tool_calls)
+            _log_required_tool_calls(parsed_calls)
+
+            # Execute required tool calls
             outputs = []
-            run_summary["timestamps"]["tools_start"] = time.time()
-            for call in tool_calls:
-                try:
-                    name = getattr(call.function, 'name', None) or getattr(call.function, 'function_name', None)
-                    raw_args = getattr(call.function, 'arguments', None) or "{}"
-                    args = _safe_load_json(raw_args or "{}")
-                    if name == "manage_files" and args.get("operation") == "list":
-                        name = "list_blobs"
-                        args = {"prefix": args.get("prefix")}
-                    call_start = time.time()
-                    try:
-                        if not isinstance(args, dict):
-                            args = dict(args or {})
-                    except Exception:
-                        args = args or {}
-                    if args.get("user_id") and args.get("user_id") != user_id:
-                        logging.info(f"Overriding tool arg user_id={args.get('user_id')} -> {user_id}")
-                    args["user_id"] = user_id
-                    if "thread_id" in args and args.get("thread_id") != thread_id:
-                        logging.info(f"Overriding tool arg thread_id={args.get('thread_id')} -> {thread_id}")
-                    if thread_id:
-                        args["thread_id"] = thread_id
-
-                    result_str, info = execute_tool_call(name, args, user_id)
-                    call_end = time.time()
+            run_summary.timestamps["tools_start"] = time.time()
+            for output, info in _execute_required_tool_calls(parsed_calls, user_id, thread_id):
+                outputs.append(output)
+                if info is not None:
                     all_tool_calls.append(info)
-                    try:
-                        parsed_output = json.loads(result_str)
-                    except Exception:
-                        parsed_output = result_str
-                    outputs.append({
-                        "tool_call_id": getattr(call, 'id', None),
-                        "name": name,
-                        "arguments": args,
-                        "output": parsed_output,
-                        "info": info,
-                        "duration_ms": (call_end - call_start) * 1000,
-                    })
-                    tool_outputs_struct.append(outputs[-1])
-                except Exception as call_exc:
-                    if DEBUG_TOOL_CALL_HANDLER:
-                        logging.exception(f"Error executing tool call {name}: {call_exc}")
-                    outputs.append({"tool_call_id": getattr(call, 'id', None), "name": name, "error": str(call_exc)})
-            run_summary["timestamps"]["tools_end"] = time.time()
-            run_summary["steps"].append({"step": "tools", "count": len(outputs), "outputs": outputs})
+                    tool_outputs_struct.append(output)
+            run_summary.timestamps["tools_end"] = time.time()
+            run_summary.steps.append({"step": "tools", "count": len(outputs), "outputs": outputs})
+            tool_outputs = _tool_outputs_payload(outputs)
+            # Plain submit; the loop below polls the run under its own deadline, request budget
+            # and backoff (the SDK's *_and_poll helper has no deadline and bypasses _openai_call).
             try:
-                _openai_call(openai_client.beta.threads.runs.submit_tool_outputs, thread_id=thread_id, run_id=run.id, tool_outputs=[{"tool_call_id": o.get('tool_call_id'), "output": json.dumps(o.get('output')) if not isinstance(o.get('output'), str) else o.get('output')} for o in outputs])
+                _openai_call(openai_client.beta.threads.runs.submit_tool_outputs, thread_id=thread_id, run_id=run.id, tool_outputs=tool_outputs)
             except Exception as submit_exc:
-                if DEBUG_TOOL_CALL_HANDLER:
-                    logging.exception(f"Failed to submit tool outputs: {submit_exc}")
-            run = _openai_call(openai_client.beta.threads.runs.retrieve, thread_id=thread_id, run_id=run.id)
-            if run.status == "completed":
-                run_summary["timestamps"]["completed_after_tools"] = time.time()
-                break
-            if run.status == "failed":
-                if DEBUG_TOOL_CALL_HANDLER:
-                    logging.error(f"Run failed after submitting tool outputs: {getattr(run, 'last_error', None)}")
-                raise RuntimeError(str(getattr(run, 'last_error', 'run failed after tools')))
+                # Continuing would re-read a run still in requires_action and run every tool again.
+                logging.warning("Failed to submit tool outputs for run %s: %s", run.id, submit_exc, exc_info=DEBUG_TOOL_CALL_HANDLER)
+                raise
             continue
-        if (time.time() - poll_start) > max_poll_s:
+        if (time.monotonic() - poll_start) > _RUN_MAX_WAIT_S:
             raise RuntimeError("Polling timed out")
-        jitter = random.uniform(0, min(0.1, poll_delay * 0.2))
+        jitter = next(_POLL_JITTER) * min(0.1, poll_delay * 0.2)
         time.sleep(poll_delay + jitter)
         poll_delay = min(max_delay, poll_delay * backoff_factor)
 
     return run, all_tool_calls, tool_outputs_struct, run_summary
 
 
+def _get_attr(msg: Any, key: str):
+    if isinstance(msg, dict):
+        return msg.get(key)
+    return getattr(msg, key, None)
+
+
+def _get_role(msg: Any) -> str:
+    return str(_get_attr(msg, "role") or "")
+
+
+def _created_at_int(msg: Any):
+    created_at = _get_attr(msg, "created_at")
+    if created_at is None:
+        return None
+    try:
+        return int(created_at)
+    except Exception:
+        return None
+
+
+def _extract_text_from_message(msg: Any):
+    contents = _get_attr(msg, "content") or []
+    # Fast path: SDK messages carry TextContentBlock items with `.text.value`.
+    if contents and hasattr(contents[0], "text"):
+        value = getattr(contents[0].text, "value", None)
+        if value:
+            return value
+    for item in contents:
+        # SDK object shape: item.text.value
+        try:
+            if hasattr(item, "text") and getattr(item.text, "value", None):
+                return item.text.value
+        except Exception:
+            pass
+        # REST/dict shape: {"type":"text","text":{"value":"..."}}
+        if isinstance(item, dict):
+            if item.get("type") == "text":
+                text_obj = item.get("text")
+                if isinstance(text_obj, dict):
+                    if text_obj.get("value"):
+                        return text_obj.get("value")
+                elif isinstance(text_obj, str) and text_obj:
+                    return text_obj
+    return None
+
+
 def finalize_response(
     openai_client: OpenAI,
     thread_id: str,
@@ -998,62 +1645,32 @@ def finalize_response(
     runtime_used: str = "assistants",
     responses_meta: Dict[str, Any] = None,
 ):
-    """Collect assistant response, save interaction, and return final HttpResponse."""
+    """Collect assistant response, save interaction, and return final HttpResponse.
+    `openai_client` is expected to be the shared `_get_client()` instance.
+    """
     messages = None
     if not assistant_response_override and runtime_used == "assistants":
-        # Request a limited number of messages to reduce payload and latency.
-        # Use limit=10 conservatively.
+        # After a completed run the newest message is the assistant reply, so fetch just that one.
         try:
-            messages = _openai_call(openai_client.beta.threads.messages.list, thread_id=thread_id, limit=10)
+            messages = _openai_call(openai_client.beta.threads.messages.list, thread_id=thread_id, limit=1, order="desc")
         except TypeError:
             # Some SDK versions may not accept 'limit' as a kwarg; fall back to call without it.
             messages = _openai_call(openai_client.beta.threads.messages.list, thread_id=thread_id)
 
-    def _get_attr(msg: Any, key: str):
-        if isinstance(msg, dict):
-            return msg.get(key)
-        return getattr(msg, key, None)
-
-    def _get_role(msg: Any) -> str:
-        return str(_get_attr(msg, "role") or "")
-
-    def _created_at_int(msg: Any):
-        created_at = _get_attr(msg, "created_at")
-        if created_at is None:
-            return None
-        try:
-            return int(created_at)
-        except Exception:
-            return None
-
-    def _extract_text_from_message(msg: Any):
-        contents = _get_attr(msg, "content") or []
-        for item in contents:
-            # SDK object shape: item.text.value
-            try:
-                if hasattr(item, "text") and getattr(item.text, "value", None):
-                    return item.text.value
-            except Exception:
-                pass
-            # REST/dict shape: {"type":"text","text":{"value":"..."}}
-            if isinstance(item, dict):
-                if item.get("type") == "text":
-                    text_obj = item.get("text")
-                    if isinstance(text_obj, dict):
-                        if text_obj.get("value"):
-                            return text_obj.get("value")
-                    elif isinstance(text_obj, str) and text_obj:
-                        return text_obj
-        return None
-
     assistant_response = assistant_response_override or None
     if not assistant_response:
         assistant_response = None
         if runtime_used == "assistants" and messages is not None:
             try:
                 data_iter = list(getattr(messages, "data", []) or [])
-                assistant_msgs = [m for m in data_iter if _get_role(m) == "assistant"]
-                if assistant_msgs:
+                if len(data_iter) == 1:
+                    # limit=1/order=desc: the only item is the newest message.
+                    assistant_msgs = data_iter if _get_role(data_iter[0]) == "assistant" else []
+                else:
+                    assistant_msgs = [m for m in data_iter if _get_role(m) == "assistant"]
+                if len(assistant_msgs) == 1:
+                    assistant_response = _extract_text_from_message(assistant_msgs[0])
+                elif assistant_msgs:
                     if any(_created_at_int(m) is not None for m in assistant_msgs):
                         chosen = max(assistant_msgs, key=lambda m: (_created_at_int(m) or -1))
                     else:
@@ -1073,13 +1690,8 @@ def finalize_response(
         logging.debug("Failed to emit concise interaction summary")
 
     if log_interaction:
-        save_interaction_log(
-            user_id=user_id,
-            user_message=user_message,
-            assistant_response=assistant_response,
-            thread_id=thread_id,
-            tool_calls_info=all_tool_calls,
-        )
+        # Off the response path: the blob write does not change what the caller gets back.
+        _interaction_executor.submit(save_interaction_log, user_id, user_message, assistant_response, thread_id, all_tool_calls)
 
     # `total_ms` can be supplied by caller; default to 0 if not provided.
     tools_ms = sum(call.get("duration_ms", 0) for call in all_tool_calls)
@@ -1102,108 +1714,155 @@ def finalize_response(
     return _make_response(body, status_code=200)
 
 
+# Static error bodies, pre-encoded so these paths in main() need no serializer.
+_ERR_INTERNAL = b'{"error":"Internal server error"}'
+_ERR_INVALID_JSON = b'{"error":"Invalid JSON payload"}'
+
+
 def _make_response(body: Any, status_code: int = 200):
     """Return a tuple (body, status, headers) which the Functions worker accepts for HTTP output."""
     if isinstance(body, (dict, list)):
-        body_text = json.dumps(body, ensure_ascii=False)
+        body_bytes = _dumps_bytes(body)
+    elif isinstance(body, bytes):
+        body_bytes = body
     else:
-        body_text = str(body)
+        body_bytes = str(body).encode("utf-8")
     # When running under the Functions worker, return a proper HttpResponse
     if AZURE_FUNCTIONS_AVAILABLE:
         try:
-            return func.HttpResponse(body_text, status_code=status_code, mimetype="application/json")
+            return func.HttpResponse(body_bytes, status_code=status_code, mimetype="application/json")
         except Exception:
             # Fallback to tuple if HttpResponse construction fails for some reason
-            return body_text, status_code, {"Content-Type": "application/json"}
-    return body_text, status_code, {"Content-Type": "application/json"}
+            return body_bytes.decode("utf-8"), status_code, {"Content-Type": "application/json"}
+    return body_bytes.decode("utf-8"), status_code, {"Content-Type": "application/json"}
 
 
-def _openai_rest_headers(include_beta: bool = True) -> Dict[str, str]:
-    """Build standard headers for OpenAI REST requests, including the
+def _openai_rest_headers(include_beta: bool = True) -> Mapping[str, str]:
+    """Return the standard headers for OpenAI REST requests, including the
     OpenAI-Beta header required for the Assistants API when requested.
+    The mappings are built once and read-only; copy with dict() before mutating.
     """
-    headers = {"Authorization": f"Bearer {OPENAI_API_KEY}", "Content-Type": "application/json"}
-    try:
-        if include_beta:
-            headers["OpenAI-Beta"] = "assistants=v2"
-    except Exception:
-        pass
-    return headers
+    return _REST_HEADERS_BETA if include_beta else _REST_HEADERS_PLAIN
+
+
+# Only include required fields for each function when dispatching via proxy_router
+# (per DATA_EXTRACTION_FUNCTIONS_REFERENCE.md).
+_DATA_EXTRACTION_REQUIRED: Dict[str, frozenset] = {
+    "add_new_data": frozenset({"target_blob_name", "new_entry"}),
+    "get_filtered_data": frozenset({"target_blob_name", "filter_key", "filter_value"}),
+    "get_interaction_history": frozenset({"thread_id", "limit", "offset"}),
+    "list_blobs": frozenset({"prefix"}),
+    "manage_files": frozenset({"operation", "source_name", "target_name", "prefix"}),
+    "proxy_router": frozenset({"action", "params"}),
+    "read_blob_file": frozenset({"file_name"}),
+    "read_many_blobs": frozenset({"files", "tail_lines", "tail_bytes", "max_bytes_per_file", "parse_json", "max_files"}),
+    "remove_data_entry": frozenset({"target_blob_name", "key_to_find", "value_to_find"}),
+    "save_interaction": frozenset({"user_message", "assistant_response", "thread_id", "tool_calls", "metadata"}),
+    "update_data_entry": frozenset({"target_blob_name", "find_key", "find_value", "update_key", "update_value"}),
+    "upload_data_or_file": frozenset({"target_blob_name", "file_content"}),
+}
 
 
 def execute_tool_call(tool_name: str, tool_arguments: Dict[str, Any], user_id: str) -> Tuple[str, Dict[str, Any]]:
-    """Call proxy_router for a given tool."""
-    start_time = time.time()
-    normalized_args = normalize_tool_arguments(tool_name, tool_arguments)
-    params_with_user = {**(normalized_args or {}), "user_id": user_id}
-    logging.debug(f"Dispatching tool={tool_name} with params={params_with_user}")
+    """
+    Call proxy_router for a given tool; returns the result as a JSON string.
+    Only for callers that need text (Responses function_call_output); everything else
+    should use execute_tool_call_raw and skip the encode/decode round-trip.
+    """
+    result, info = execute_tool_call_raw(tool_name, tool_arguments, user_id)
+    return _dumps(result), info
 
-    # Try in-process dispatch first
-    try:
-        from tools import dispatch_tool
-        result = dispatch_tool(tool_name, normalized_args, user_id)
-        duration_ms = (time.time() - start_time) * 1000
-        info = {"tool_name": tool_name, "arguments": normalized_args, "result": result, "status": "success", "duration_ms": duration_ms}
-        logging.info(f"Tool {tool_name} OK in-process in {duration_ms:.1f}ms")
-        return json.dumps(result), info
-    except ImportError as e:
-        logging.warning(f"tools module not available for in-process dispatch: {e}")
-    except Exception as e:
-        logging.warning(f"In-process dispatch failed for {tool_name}: {e}. Falling back to proxy_router.")
-        # Only include required fields for each function (per DATA_EXTRACTION_FUNCTIONS_REFERENCE.md)
-        DATA_EXTRACTION_REQUIRED = {
-            "add_new_data": ["target_blob_name", "new_entry"],
-            "get_filtered_data": ["target_blob_name", "filter_key", "filter_value"],
-            "get_interaction_history": ["thread_id", "limit", "offset"],
-            "list_blobs": ["prefix"],
-            "manage_files": ["operation", "source_name", "target_name", "prefix"],
-            "proxy_router": ["action", "params"],
-            "read_blob_file": ["file_name"],
-            "read_many_blobs": ["files", "tail_lines", "tail_bytes", "max_bytes_per_file", "parse_json", "max_files"],
-            "remove_data_entry": ["target_blob_name", "key_to_find", "value_to_find"],
-            "save_interaction": ["user_message", "assistant_response", "thread_id", "tool_calls", "metadata"],
-            "update_data_entry": ["target_blob_name", "find_key", "find_value", "update_key", "update_value"],
-            "upload_data_or_file": ["target_blob_name", "file_content"],
-        }
 
+@functools.lru_cache(maxsize=256)
+def _function_url(tool_name: str) -> str:
+    """Direct function URL for GET-style tools; cleared by refresh_env()."""
+    return f"{_FUNCTION_URL_BASE or _DEFAULT_FUNCTION_URL_BASE}/api/{tool_name}"
+
+
+@functools.lru_cache(maxsize=256)
+def _proxy_headers(user_id: str) -> Mapping[str, str]:
+    """Per-user proxy_router headers, built once and shared read-only across calls."""
+    headers = {"X-User-Id": user_id, "Content-Type": "application/json"}
+    if PROXY_FUNCTION_KEY:
+        headers["x-functions-key"] = PROXY_FUNCTION_KEY
+    return MappingProxyType(headers)
+
+
+def execute_tool_call_raw(tool_name: str, tool_arguments: Dict[str, Any], user_id: str) -> Tuple[Any, Dict[str, Any]]:
+    """Call proxy_router for a given tool; returns the decoded result without re-serializing it."""
+    start_time = time.perf_counter()
+    # Resolved once per call: the request/response dumps below are skipped entirely unless
+    # the debug flag is on and INFO records would actually be emitted.
+    dbg = DEBUG_TOOL_CALL_HANDLER and logging.getLogger().isEnabledFor(logging.INFO)
+    normalized_args = normalize_tool_arguments(tool_name, tool_arguments)
+    logging.debug("Dispatching tool=%s user_id=%s params=%s", tool_name, user_id, normalized_args)
+    # Set only when in-process dispatch fails; otherwise the HTTP paths send normalized_args + user_id.
+    filtered_args = None
+
+    # Try in-process dispatch first. Only tools missing from the registry (e.g.
+    # get_interaction_history) and transient I/O errors go on to proxy_router; any other
+    # tool error would fail the same way behind the proxy, so it is reported directly.
+    proxy_fallback = False
+    dispatch_tool, tool_registry = _in_process_tools()
+    if dispatch_tool is not None:
+        if tool_name in tool_registry:
+            try:
+                result = dispatch_tool(tool_name, normalized_args, user_id)
+                duration_ms = (time.perf_counter() - start_time) * 1000
+                info = {"tool_name": tool_name, "arguments": normalized_args, "result": result, "status": "success", "duration_ms": duration_ms}
+                logging.info(f"Tool {tool_name} OK in-process in {duration_ms:.1f}ms")
+                return result, info
+            except (ConnectionError, TimeoutError) as e:
+                logging.warning("In-process dispatch failed for %s: %s. Falling back to proxy_router.", tool_name, e)
+                proxy_fallback = True
+            except Exception as e:
+                duration_ms = (time.perf_counter() - start_time) * 1000
+                logging.warning("In-process dispatch failed for %s: %s", tool_name, e)
+                info = {"tool_name": tool_name, "arguments": normalized_args, "error": str(e), "status": "failed", "duration_ms": duration_ms}
+                return {"error": str(e)}, info
+        else:
+            proxy_fallback = True
+    if proxy_fallback:
         # Only include user_id for tool_call_handler (if enforced)
         include_user_id = tool_name == "tool_call_handler"
 
         # Filter out user_id for all other functions
-        if tool_name in DATA_EXTRACTION_REQUIRED:
-            required_fields = DATA_EXTRACTION_REQUIRED[tool_name]
+        required_fields = _DATA_EXTRACTION_REQUIRED.get(tool_name)
+        if required_fields:
             filtered_args = {k: v for k, v in (normalized_args or {}).items() if k in required_fields and v is not None}
         else:
             filtered_args = dict(normalized_args or {})
         if include_user_id:
             filtered_args["user_id"] = user_id
 
-        logging.debug(f"Dispatching tool={tool_name} with params={filtered_args}")
-    headers = {"X-User-Id": user_id, "Content-Type": "application/json"}
-    if PROXY_FUNCTION_KEY:
-        headers["x-functions-key"] = PROXY_FUNCTION_KEY
+        logging.debug("Dispatching tool=%s with params=%s", tool_name, filtered_args)
+    headers = _proxy_headers(user_id)
 
     # Hard validation for manage_files to avoid bad requests
     if tool_name == "manage_files":
-        op = params_with_user.get("operation")
-        src = params_with_user.get("source_name")
-        tgt = params_with_user.get("target_name")
+        op = (normalized_args or {}).get("operation")
+        src = (normalized_args or {}).get("source_name")
+        tgt = (normalized_args or {}).get("target_name")
         if op is None:
             err = "manage_files requires 'operation' (rename/delete)"
             info = {"tool_name": tool_name, "arguments": normalized_args, "error": err, "status": "failed", "duration_ms": 0}
-            return json.dumps({"error": err}), info
+            return {"error": err}, info
         if op not in ["rename", "delete"]:
             err = f"manage_files operation '{op}' is not supported. Use list_blobs for listing."
             info = {"tool_name": tool_name, "arguments": normalized_args, "error": err, "status": "failed", "duration_ms": 0}
-            return json.dumps({"error": err}), info
+            return {"error": err}, info
         if not src:
             err = "manage_files requires 'source_name'"
             info = {"tool_name": tool_name, "arguments": normalized_args, "error": err, "status": "failed", "duration_ms": 0}
-            return json.dumps({"error": err}), info
+            return {"error": err}, info
         if op == "rename" and not tgt:
             err = "manage_files rename requires 'target_name'"
             info = {"tool_name": tool_name, "arguments": normalized_args, "error": err, "status": "failed", "duration_ms": 0}
-            return json.dumps({"error": err}), info
+            return {"error": err}, info
+
+    # Built here rather than up front: the in-process path above never needs the copy.
+    if filtered_args is None:
+        filtered_args = {**(normalized_args or {}), "user_id": user_id}
 
     try:
         # Some backend functions expect GET (e.g. get_interaction_history).
@@ -1212,42 +1871,37 @@ def execute_tool_call(tool_name: str, tool_arguments: Dict[str, Any], user_id: s
         # endpoints, call the function URL directly with GET to preserve method.
         # Validate proxy configuration for POST-style dispatch
         if tool_name == "get_interaction_history":
-            function_base = os.getenv("FUNCTION_URL_BASE", "http://localhost:7071").rstrip("/")
-            func_url = f"{function_base}/api/{tool_name}"
-            if DEBUG_TOOL_CALL_HANDLER:
-                logging.info(f"[DEBUG] GET {func_url} params={_redact_sensitive(dict(filtered_args if 'filtered_args' in locals() else params_with_user))} headers={_redact_sensitive(dict(headers))}")
+            func_url = _function_url(tool_name)
+            if dbg:
+                logging.info("[DEBUG] GET %s params=%s headers=%s", func_url, _LazyRedact(filtered_args), _LazyRedact(headers))
             try:
                 # Use filtered_args to avoid sending assistant-supplied extras when available
-                get_params = filtered_args if 'filtered_args' in locals() else params_with_user
-                resp = requests.get(func_url, params=get_params, headers=headers, timeout=45)
+                resp = _SESSION.get(func_url, params=filtered_args, headers=headers, timeout=45)
                 resp.raise_for_status()
-                try:
-                    result = resp.json()
-                except ValueError:
-                    result = {"raw_response": resp.text}
+                result = _parse_response_body(resp)
             except requests.RequestException as e:
-                duration_ms = (time.time() - start_time) * 1000
-                logging.warning(f"GET {func_url} failed: {e}")
+                duration_ms = (time.perf_counter() - start_time) * 1000
+                logging.warning("GET %s failed: %s", func_url, e)
                 info = {"tool_name": tool_name, "arguments": normalized_args, "error": str(e), "status": "failed", "duration_ms": duration_ms}
-                return json.dumps({"error": str(e)}), info
+                return {"error": str(e)}, info
         else:
             if not PROXY_URL:
                 err = "AZURE_PROXY_URL not configured"
-                duration_ms = (time.time() - start_time) * 1000
+                duration_ms = (time.perf_counter() - start_time) * 1000
                 info = {"tool_name": tool_name, "arguments": normalized_args, "error": err, "status": "failed", "duration_ms": duration_ms}
                 logging.error(err)
-                return json.dumps({"error": err}), info
+                return {"error": err}, info
             # When dispatching via proxy, prefer the filtered argument set constructed
             # above to avoid leaking assistant-supplied or extraneous fields.
-            payload = {"action": tool_name, "params": filtered_args if 'filtered_args' in locals() else params_with_user}
-            if DEBUG_TOOL_CALL_HANDLER:
-                logging.info(f"[DEBUG] POST {PROXY_URL} json={_redact_sensitive(payload)} headers={_redact_sensitive(dict(headers))}")
+            payload = {"action": tool_name, "params": filtered_args}
+            if dbg:
+                logging.info("[DEBUG] POST %s json=%s headers=%s", PROXY_URL, _LazyRedact(payload), _LazyRedact(headers))
             try:
-                resp = requests.post(PROXY_URL, json=payload, headers=headers, timeout=45)
+                resp = _SESSION.post(PROXY_URL, data=_dumps_bytes(payload), headers=headers, timeout=45)
                 resp.raise_for_status()
             except requests.RequestException as e:
-                duration_ms = (time.time() - start_time) * 1000
-                logging.warning(f"POST to proxy failed: {e}")
+                duration_ms = (time.perf_counter() - start_time) * 1000
+                logging.warning("POST to proxy failed: %s", e)
                 info = {"tool_name": tool_name, "arguments": normalized_args, "error": str(e), "status": "failed", "duration_ms": duration_ms}
                 # Include response body if available
                 body_text = None
@@ -1255,57 +1909,58 @@ def execute_tool_call(tool_name: str, tool_arguments: Dict[str, Any], user_id: s
                     body_text = resp.text
                 except Exception:
                     pass
-                return json.dumps({"error": str(e), "proxy_body": (body_text or "")}), info
-            try:
-                parsed = resp.json()
-            except ValueError:
-                parsed = {"raw_response": resp.text}
+                return {"error": str(e), "proxy_body": (body_text or "")}, info
+            parsed = _parse_response_body(resp)
             # Normalize non-dict responses
             if not isinstance(parsed, (dict, list)):
                 parsed = {"raw": parsed}
             result = parsed
-        if DEBUG_TOOL_CALL_HANDLER:
+        if dbg:
             try:
-                body_snippet = result if isinstance(result, (dict, list)) else (resp.text[:2000] + "...[truncated]" if len(resp.text) > 2000 else resp.text)
+                body_snippet = result if isinstance(result, (dict, list)) else _body_snippet(resp, 2000)
             except Exception:
                 body_snippet = "<unserializable>"
-            logging.info(f"[DEBUG] Response status={getattr(resp, 'status_code', 'n/a')} body={_redact_sensitive(body_snippet if isinstance(body_snippet, dict) else {'raw': body_snippet})}")
-        duration_ms = (time.time() - start_time) * 1000
+            logging.info("[DEBUG] Response status=%s body=%s", getattr(resp, 'status_code', 'n/a'), _LazyRedact(body_snippet))
+        duration_ms = (time.perf_counter() - start_time) * 1000
         info = {"tool_name": tool_name, "arguments": normalized_args, "result": result, "status": "success", "duration_ms": duration_ms}
         logging.info(f"Tool {tool_name} OK via proxy_router in {duration_ms:.1f}ms")
-        return json.dumps(result), info
+        return result, info
     except Exception as e:
-        duration_ms = (time.time() - start_time) * 1000
-        if DEBUG_TOOL_CALL_HANDLER:
-            logging.exception(f"Tool {tool_name} failed in {duration_ms:.1f}ms: {e}")
-        else:
-            logging.error(f"Tool {tool_name} failed in {duration_ms:.1f}ms: {e}")
+        duration_ms = (time.perf_counter() - start_time) * 1000
+        # Traceback only in debug mode; one call either way.
+        logging.error("Tool %s failed in %.1fms: %s", tool_name, duration_ms, e, exc_info=DEBUG_TOOL_CALL_HANDLER)
         info = {"tool_name": tool_name, "arguments": normalized_args, "error": str(e), "status": "failed", "duration_ms": duration_ms}
-        return json.dumps({"error": str(e)}), info
+        return {"error": str(e)}, info
+
+class _InProcReq:
+    """Minimal HttpRequest stand-in for calling save_interaction in-process."""
+
+    __slots__ = ("headers", "params", "_payload")
+
+    def __init__(self, payload: Dict[str, Any], user_id: Any):
+        uid = str(user_id)
+        self.headers = {"x-user-id": uid, "X-User-Id": uid}
+        self.params = {}
+        self._payload = payload
+
+    def get_json(self):
+        # save_interaction only reads the body, so the payload is handed over without a copy.
+        return self._payload
+
 
 def save_interaction_log(user_id: str, user_message: str, assistant_response: str, thread_id: str, tool_calls_info: list):
     if not ENABLE_SAVE_INTERACTION:
         return
+    if not user_message and not assistant_response and not tool_calls_info:
+        # Nothing worth a log entry (health checks, empty pings).
+        return
     try:
-        base = os.getenv("FUNCTION_URL_BASE", "")
-        code = os.getenv("FUNCTION_CODE_SAVE_INTERACTION", "")
-        base = str(base or "").strip().rstrip("/")
-
         # Local/dev fast path: avoid HTTP + function keys and call the function in-process.
         # This also makes the save visible in local `func` logs.
-        if not base or base.startswith("http://localhost") or base.startswith("http://127.0.0.1"):
+        if _IS_LOCAL_BASE:
             try:
                 from save_interaction import main as save_interaction_main
 
-                class _Req:
-                    def __init__(self, _payload, _user_id):
-                        self.headers = {"x-user-id": str(_user_id), "X-User-Id": str(_user_id)}
-                        self.params = {}
-                        self._payload = _payload
-
-                    def get_json(self):
-                        return dict(self._payload)
-
                 payload_local = {
                     "user_message": user_message,
                     "assistant_response": assistant_response,
@@ -1314,29 +1969,26 @@ def save_interaction_log(user_id: str, user_message: str, assistant_response: st
                     "metadata": {"assistant_id": ASSISTANT_ID, "source": "tool_call_handler"},
                     "user_id": user_id,
                 }
-                resp = save_interaction_main(_Req(payload_local, user_id))
+                resp = save_interaction_main(_InProcReq(payload_local, user_id))
+                # Body read once; the debug line decodes only its slice and the check parses the bytes.
+                raw_body = _response_body(resp)
                 if DEBUG_TOOL_CALL_HANDLER:
-                    try:
-                        body_text = resp.get_body().decode("utf-8") if hasattr(resp, "get_body") else str(resp)
-                    except Exception:
-                        body_text = "<unreadable>"
-                    logging.info(f"[DEBUG] save_interaction in-process done body={body_text[:500]}")
+                    body_text = raw_body[:500].decode("utf-8", "replace") if raw_body else str(resp)[:500]
+                    logging.info("[DEBUG] save_interaction in-process done body=%s", body_text)
                 try:
-                    body_text = resp.get_body().decode("utf-8") if hasattr(resp, "get_body") else ""
-                    parsed = json.loads(body_text) if body_text else {}
+                    parsed = _loads(raw_body) if raw_body else {}
                     if isinstance(parsed, dict) and parsed.get("success") is False:
-                        logging.warning(f"save_interaction failed: {parsed.get('details') or parsed}")
+                        logging.warning("save_interaction failed: %s", parsed.get('details') or parsed)
                 except Exception:
                     pass
                 return
             except Exception as inproc_exc:
                 if DEBUG_TOOL_CALL_HANDLER:
-                    logging.warning(f"[DEBUG] save_interaction in-process failed: {inproc_exc}; falling back to HTTP")
+                    logging.warning("[DEBUG] save_interaction in-process failed: %s; falling back to HTTP", inproc_exc)
 
-        if not base or not code:
+        if _SAVE_URL is None:
             return
 
-        url = f"{base}/api/save_interaction?code={code}"
         payload = {
             "user_message": user_message,
             "assistant_response": assistant_response,
@@ -1345,21 +1997,18 @@ def save_interaction_log(user_id: str, user_message: str, assistant_response: st
             "metadata": {"assistant_id": ASSISTANT_ID, "source": "tool_call_handler"},
         }
         headers = {"Content-Type": "application/json", "X-User-Id": user_id}
-        def _fire_and_forget():
+        # Already running on the interaction-log thread, so post inline. Encoded once with
+        # the module encoder (orjson when present; default=str keeps odd tool results savable)
+        # instead of requests' stdlib json= path.
+        r = _SIBLING_CLIENT.post(_SAVE_URL, content=_dumps_bytes(payload), headers=headers)
+        if DEBUG_TOOL_CALL_HANDLER:
             try:
-                r = requests.post(url, json=payload, headers=headers, timeout=(1, 10))
-                if DEBUG_TOOL_CALL_HANDLER:
-                    try:
-                        snippet = (r.text or "")[:500]
-                    except Exception:
-                        snippet = "<unreadable>"
-                    logging.info(f"[DEBUG] save_interaction http status={getattr(r,'status_code','n/a')} body={snippet}")
-            except Exception as post_exc:
-                logging.warning(f"save_interaction_log failed: {post_exc}")
-
-        threading.Thread(target=_fire_and_forget, daemon=True).start()
+                snippet = _body_snippet(r, 500, marker="")
+            except Exception:
+                snippet = "<unreadable>"
+            logging.info(f"[DEBUG] save_interaction http status={getattr(r,'status_code','n/a')} body={snippet}")
     except Exception as e:
-        logging.warning(f"save_interaction_log failed: {e}")
+        logging.warning("save_interaction_log failed: %s", e)
 
 
 def main(req: func.HttpRequest) -> func.HttpResponse:
@@ -1376,7 +2025,7 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         try:
             body = req.get_json()
         except Exception:
-            return _make_response({"error": "Invalid JSON payload"}, status_code=400)
+            return _make_response(_ERR_INVALID_JSON, status_code=400)
 
         user_message = body.get("message", "")
         user_id, _user_id_source = resolve_user_id(req, body)
@@ -1399,16 +2048,24 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             return _make_response({"error": str(vex)}, status_code=400)
 
         if runtime_requested == "auto":
-            if not _missing_env_vars_for_runtime("responses"):
+            # Precomputed tuples: the branch tests allocate nothing; a list is built only for the 503.
+            if not _MISSING_ENV_VARS["responses"]:
                 runtime_used = "responses"
-            elif not _missing_env_vars_for_runtime("assistants"):
+            elif not _MISSING_ENV_VARS["assistants"]:
                 runtime_used = "assistants"
             else:
                 # Prefer listing everything required for both runtimes to aid setup.
-                missing = sorted(set(_missing_env_vars_for_runtime("responses") + _missing_env_vars_for_runtime("assistants")))
+                missing = _MISSING_ENV_VARS["auto"]
                 return _make_response({"error": f"Missing env vars: {', '.join(missing)}", "status": "not_configured"}, status_code=503)
         else:
             runtime_used = runtime_requested
+        if runtime_used == "assistants" and _is_simple_turn(user_message, body):
+            # Decided only after the storage lookup: the thread id is normally restored from
+            # blob, not sent in the body, and a restored one is reused by the Assistants path.
+            thread_id = _restore_thread_id(user_id)
+            if not thread_id:
+                logging.info("Simple turn: using the Responses fast path instead of an Assistants run")
+                runtime_used = "responses"
 
         # Config check (after direct actions so save/get can work without proxy config)
         missing = _missing_env_vars_for_runtime(runtime_used)
@@ -1416,15 +2073,15 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             return _make_response({"error": f"Missing env vars: {', '.join(missing)}", "status": "not_configured", "runtime": runtime_used}, status_code=503)
 
         # Run
-        # Initialize OpenAI client and detect SDK capabilities early so we
-        # can attempt SDK-based thread creation before falling back to REST.
-        openai_client = OpenAI(api_key=OPENAI_API_KEY)
+        # Shared OpenAI client (see _get_client); SDK-based thread creation is attempted
+        # before falling back to REST.
+        openai_client = _get_client()
         # Note: SDK tool_resources support is detectable via _supports_tool_resources(),
         # but the value is not used in this handler; keep function available for future use.
 
         # Responses runtime (Prompt ID + deterministic tool loop)
         if runtime_used == "responses":
-            request_start = time.time()
+            request_start = time.perf_counter()
             try:
                 assistant_response, all_tool_calls, responses_meta, thread_id = run_responses(
                     openai_client=openai_client,
@@ -1438,7 +2095,7 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
                 logging.exception(f"Failed during responses loop: {exc}")
                 return _make_response({"error": "Internal server error", "details": str(exc), "runtime": "responses"}, status_code=500)
 
-            total_ms = (time.time() - request_start) * 1000
+            total_ms = (time.perf_counter() - request_start) * 1000
             return finalize_response(
                 openai_client=openai_client,
                 thread_id=thread_id,
@@ -1479,40 +2136,36 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         run = None
         all_tool_calls = []
         tool_outputs_struct = []
-        request_start = time.time()
+        request_start = time.perf_counter()
         # Vector store support removed per configuration: we no longer attach
         # OpenAI-managed vector stores to runs. This simplifies runtime
         # behavior and avoids SDK/proxy compatibility issues.
         vector_store_attached = False
         # Run summary and per-step timestamps
-        run_summary = {"timestamps": {}, "steps": []}
+        run_summary = _RunSummary()
 
         # Optional pre-run restore (caller may request state restore)
         do_restore = bool(body.get("do_restore", False))
         if do_restore:
             try:
-                run_summary["timestamps"]["restore_start"] = time.time()
-                base = os.getenv("FUNCTION_URL_BASE", "http://localhost:7071").rstrip("/")
-                restore_url = f"{base}/api/restore_session"
-                function_code_env = os.getenv("FUNCTION_CODE_RESTORE_SESSION", "")
-                if function_code_env:
-                    restore_url = f"{restore_url}?code={function_code_env}"
+                run_summary.timestamps["restore_start"] = time.time()
+                restore_url = _RESTORE_URL
                 headers = {"X-User-Id": str(user_id), "Content-Type": "application/json"}
                 if DEBUG_TOOL_CALL_HANDLER:
                     logging.info(f"[DEBUG] Calling restore_session {restore_url} user_id={user_id}")
                 try:
-                    r = requests.post(restore_url, json={"user_id": user_id, "thread_id": thread_id}, headers=headers, timeout=30)
+                    r = _SIBLING_CLIENT.post(restore_url, content=_dumps_bytes({"user_id": user_id, "thread_id": thread_id}), headers=headers, timeout=30)
                     r.raise_for_status()
                     try:
-                        restore_result = r.json()
+                        restore_result = _loads(r.content)
                     except Exception:
                         restore_result = {"raw": r.text}
                 except Exception as e:
                     restore_result = {"error": str(e)}
                     if DEBUG_TOOL_CALL_HANDLER:
                         logging.exception("Restore session failed")
-                run_summary["timestamps"]["restore_end"] = time.time()
-                run_summary["steps"].append({"step": "restore", "result": restore_result})
+                run_summary.timestamps["restore_end"] = time.time()
+                run_summary.steps.append({"step": "restore", "result": restore_result})
             except Exception as e:
                 if DEBUG_TOOL_CALL_HANDLER:
                     logging.exception(f"Unexpected error during restore: {e}")
@@ -1529,7 +2182,7 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             return _make_response({"error": "Internal server error", "details": str(exc)}, status_code=500)
 
         # Build final response and return
-        total_ms = (time.time() - request_start) * 1000
+        total_ms = (time.perf_counter() - request_start) * 1000
         return finalize_response(
             openai_client,
             thread_id,
@@ -1549,10 +2202,10 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         except Exception:
             # Fallback: construct HttpResponse directly to avoid worker encoding issues
             try:
-                return func.HttpResponse(json.dumps({"error": "Internal server error"}), status_code=500, mimetype="application/json")
+                return func.HttpResponse(_ERR_INTERNAL, status_code=500, mimetype="application/json")
             except Exception:
                 # As a last resort, return a plain tuple (the worker may still handle it)
-                return json.dumps({"error": "Internal server error"}), 500, {"Content-Type": "application/json"}
+                return _ERR_INTERNAL.decode("utf-8"), 500, {"Content-Type": "application/json"}
     finally:
         if file_handler is not None and detach_file_handler:
             try:
@@ -31,6 +31,7 @@ from shared.wp7_indexer import (
     derive_signal_level,
     download_queue_tail,
     load_indexer_state,
+    loads_json,
     save_indexer_state,
     utc_now_iso,
 )
@@ -78,7 +79,7 @@ def _iter_jsonl_lines(data: bytes) -> List[Tuple[int, str]]:
             if not tail:
                 break
             try:
-                json.loads(tail)
+                loads_json(tail)
             except Exception:
                 break
             lines.append((n - line_start, tail))
@@ -136,7 +137,7 @@ def _load_batch_state(user_id: str) -> Dict[str, Any]:
             "updated_at_utc": utc_now_iso(),
         }
     try:
-        payload = json.loads(raw.decode("utf-8"))
+        payload = loads_json(raw)
         if not isinstance(payload, dict):
             raise ValueError("batch_state is not an object")
         payload.setdefault("schema_version", WP7_BATCH_STATE_SCHEMA_V1)
@@ -251,17 +252,18 @@ def _should_portfolio_uncategorized(artifact: Dict[str, Any]) -> tuple[bool, lis
 
 
 def _enqueue_uncategorized_portfolio(user_id: str, artifact: Dict[str, Any], semantic_blob_path: str) -> None:
+    # Keys in sorted order: append_uncategorized_portfolio_item serializes without sort_keys.
     item = {
-        "schema_version": WP7_UNCATEGORIZED_SCHEMA_V1,
-        "timestamp_utc": utc_now_iso(),
-        "user_id": str(user_id),
-        "interaction_id": str(artifact.get("interaction_id") or "").strip(),
         "category": str(artifact.get("category") or "").strip(),
         "confidence": _parse_confidence(artifact.get("confidence")),
-        "tags": artifact.get("tags") if isinstance(artifact.get("tags"), list) else [],
-        "summary": str(artifact.get("summary") or "")[:800],
-        "semantic_blob_path": semantic_blob_path,
+        "interaction_id": str(artifact.get("interaction_id") or "").strip(),
         "portfolio_blob_name": WP7_UNCATEGORIZED_PORTFOLIO_BLOB_NAME,
+        "schema_version": WP7_UNCATEGORIZED_SCHEMA_V1,
+        "semantic_blob_path": semantic_blob_path,
+        "summary": str(artifact.get("summary") or "")[:800],
+        "tags": artifact.get("tags") if isinstance(artifact.get("tags"), list) else [],
+        "timestamp_utc": utc_now_iso(),
+        "user_id": str(user_id),
     }
     append_uncategorized_portfolio_item(user_id, item)
 
@@ -478,7 +480,7 @@ def _ingest_batch_output(
 
     for line_len, line in lines:
         try:
-            item = json.loads(line)
+            item = loads_json(line)
         except Exception:
             break
         if not isinstance(item, dict):
@@ -666,7 +668,7 @@ def _run_for_user(openai_client: OpenAI, prompt_id: str, user_id: str, threshold
     lines = _iter_jsonl_lines(data)
     if lines and 0 < offset < total:
         try:
-            json.loads(lines[0][1])
+            loads_json(lines[0][1])
         except Exception:
             new_offset = _resync_offset_to_newline(user_id, offset=offset)
             if new_offset != offset:
@@ -697,7 +699,7 @@ def _run_for_user(openai_client: OpenAI, prompt_id: str, user_id: str, threshold
         if len(candidates) >= thresholds.max_items_per_run:
             break
         try:
-            item = json.loads(line)
+            item = loads_json(line)
         except Exception:
             continue
         if not isinstance(item, dict):
@@ -15,6 +15,9 @@ import sys
 
 import requests
 
+# One keep-alive connection pool for all runtime probes.
+SESSION = requests.Session()
+
 
 def _default_url() -> str:
     base = os.getenv("FUNCTION_URL_BASE", "http://localhost:7071").rstrip("/")
@@ -39,7 +42,7 @@ def parse_args() -> argparse.Namespace:
 
 def call_handler(url: str, user_id: str, timeout: float, body: dict) -> requests.Response:
     headers = {"X-User-Id": user_id, "Content-Type": "application/json"}
-    return requests.post(url, headers=headers, json=body, timeout=timeout)
+    return SESSION.post(url, headers=headers, json=body, timeout=timeout)
 
 
 def main() -> int:
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Pin the byte-exact JSONL line written for a canonical WP7 queue item.
+
+The queue blob is append-only and consumed by the indexer, so key order,
+separators and non-ASCII handling must not drift between releases.
+Run with pytest, or directly: `python scripts/test_wp7_indexer_serialization.py`.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+from shared.wp7_indexer import QueueThresholds, _jsonl_line, build_queue_item  # noqa: E402
+
+CANONICAL_ENTRY = {
+    "interaction_id": "ix-001",
+    "timestamp": "2024-01-02T03:04:05Z",
+    "thread_id": "thread_abc",
+    "user_message": "Zażółć gęślą jaźń",
+    "assistant_response": "OK",
+    "tool_calls": [{"name": "read_blob_file"}, {"tool_name": "add_new_data"}],
+}
+
+EXPECTED_KEYS = [
+    "assistant_response",
+    "estimated_tokens",
+    "estimated_tokens_hi",
+    "interaction_id",
+    "language",
+    "schema_version",
+    "thread_id",
+    "timestamp_utc",
+    "tools_used",
+    "user_id",
+    "user_message",
+]
+
+EXPECTED_LINE = (
+    '{"assistant_response":"OK","estimated_tokens":5,"estimated_tokens_hi":7,'
+    '"interaction_id":"ix-001","language":"mixed","schema_version":"omniflow.wp7.queue.v1",'
+    '"thread_id":"thread_abc","timestamp_utc":"2024-01-02T03:04:05Z",'
+    '"tools_used":["read_blob_file","add_new_data"],"user_id":"user_1",'
+    '"user_message":"Zażółć gęślą jaźń"}\n'
+).encode("utf-8")
+
+
+def _canonical_item() -> dict:
+    return build_queue_item(CANONICAL_ENTRY, user_id="user_1", thresholds=QueueThresholds())
+
+
+def test_queue_item_key_order() -> None:
+    assert list(_canonical_item()) == EXPECTED_KEYS
+
+
+def test_queue_item_jsonl_bytes() -> None:
+    assert _jsonl_line(_canonical_item()).encode("utf-8") == EXPECTED_LINE
+
+
+if __name__ == "__main__":
+    test_queue_item_key_order()
+    test_queue_item_jsonl_bytes()
+    print("OK: WP7 queue item serialization is byte-stable")